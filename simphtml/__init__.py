@@ -1,3 +1,8 @@
 from matcher import match, MatchError
-from parser import parse, isValid, ParseError
-from tokens import tokenize, TokenizeError
+from parser import parse, iterparse, isValid, ParseError
+from tokens import tokenize, mapFile, TokenizeError, TokenBuffer, ScanTokenStream
+from serializer import serialize
+from diskcache import DiskCache
+from memo import ParseMemo
+from batch import parseMany
+from pushparser import PushParser
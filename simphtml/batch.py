@@ -0,0 +1,86 @@
+import multiprocessing
+import threading
+from tokens import TokenizeError, mapFile
+from matcher import MatchError
+from parser import SimpHtmlParser, SimpHtmlEventParser, ParseError, Tape
+from validator import validate
+
+# Errors a document can fail with, which are handed back rather than raised.
+_documentErrors = (MatchError, ParseError, TokenizeError, EnvironmentError)
+
+def parseMany(inputs, workers = None, chunksize = 16, ordered = True, validateOnly = False, paths = False,
+              layout = 'tree'):
+	"""Generator that parses many documents in a pool of worker processes, and
+yields an (input, result) pair for each of the given inputs, in their order
+if ordered is True or else as they are finished.  The result is the tree
+(or, if layout is 'tape', the Tape root) for the document, or the
+ParseError, MatchError or TokenizeError (or EnvironmentError, for a file
+that can't be read) it failed with, positions and all.
+
+If validateOnly is True, the result is True for a valid document rather
+than its tree; an invalid one is parsed, in its worker, for the error.
+
+The inputs may be any iterable, which is read as the workers need more
+work, rather than all at once: no more than twice the documents the workers
+take at a time are read ahead of the results yielded.  They are document
+strings, or the names of files holding documents if paths is True, in which
+case the files are read by the workers.  Work is handed out chunksize
+documents at a time, to keep down the cost of talking to the workers, and
+the trees come back as encoded Tapes.  workers gives the number of
+processes, and defaults to the number of CPUs; with 1, the documents are
+parsed in this process."""
+	if layout not in ('tree', 'tape'):
+		raise ValueError("Only the 'tree' and 'tape' layouts can be parsed in a batch.")
+	# Inputs handed out to the workers but not yet yielded, by number.
+	pending = {}
+	# The pool reads jobs as fast as it can, so they are held back until the results ahead of them are yielded.
+	ahead = threading.Semaphore((workers or multiprocessing.cpu_count()) * chunksize * 2)
+	# Set once no more results are wanted.
+	stopped = []
+	def jobs():
+		for number, input in enumerate(inputs):
+			ahead.acquire()
+			if stopped:
+				return
+			pending[number] = input
+			yield (number, input, paths, validateOnly)
+	if workers == 1:
+		results = (_parseJob(job) for job in jobs())
+		pool = None
+	else:
+		pool = multiprocessing.Pool(workers)
+		imap = pool.imap if ordered else pool.imap_unordered
+		results = imap(_parseJob, jobs(), chunksize)
+	try:
+		for number, kind, value in results:
+			if kind == 'tape':
+				tape = Tape.loads(value)
+				value = tape.root() if layout == 'tape' else tape.tree()
+			input = pending.pop(number)
+			ahead.release()
+			yield (input, value)
+	finally:
+		# Let jobs() stop rather than wait, and the workers finish the jobs they have.
+		stopped.append(True)
+		ahead.release()
+		if pool is not None:
+			pool.close()
+			pool.join()
+
+def _parseJob(job):
+	"""Parses one document in a worker, returning (number, kind, value), where
+kind is 'tape' for a value of an encoded Tape, 'valid' for True or 'error'
+for the error the document failed with."""
+	number, input, paths, validateOnly = job
+	try:
+		source = mapFile(input) if paths else input
+		if not validateOnly:
+			return (number, 'tape', SimpHtmlParser('scan').parseTape(source).dumps())
+		if validate(source):
+			return (number, 'valid', True)
+		# Parse the document for its error, with its position.
+		for event in SimpHtmlEventParser('scan').events(source):
+			pass
+		raise ParseError('Document is not valid.', None, None)
+	except _documentErrors as e:
+		return (number, 'error', e)
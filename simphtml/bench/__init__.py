@@ -0,0 +1,32 @@
+import time
+
+# Benchmark modules run by the bench script when none are named.
+benchmarks = ['validate', 'parse', 'text', 'memory', 'dedupe', 'lazy', 'query', 'serialize', 'cache', 'memo', 'batch', 'parallel', 'push']
+
+def measure(function, repeat = 3):
+	"""Returns the best wall clock time, in seconds, of repeat calls to function."""
+	best = None
+	for i in range(repeat):
+		start = time.time()
+		function()
+		elapsed = time.time() - start
+		if best is None or elapsed < best:
+			best = elapsed
+	return best
+
+def report(name, seconds, size = None, count = None):
+	"""Prints one benchmark result, with its throughput in MB/s for size bytes
+and/or documents per second for count documents."""
+	line = '%-40s %9.4fs' % (name, seconds)
+	if size is not None:
+		line += ' %9.2f MB/s' % (size / seconds / (1 << 20))
+	if count is not None:
+		line += ' %10.0f docs/s' % (count / seconds)
+	print line
+
+def sampleDocument(size):
+	"""Returns a valid document of roughly size bytes mixing nested tags,
+standalone tags, text and escapes."""
+	block = ('<section>\n<title>Item &amp; more</title>\n<p>Some text with a'
+	         ' &lt;literal&lt; and <em>emphasis</em>.<br/></p>\n</section>\n')
+	return '<doc>\n' + block * max(size / len(block), 1) + '</doc>\n'
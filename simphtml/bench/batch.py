@@ -0,0 +1,18 @@
+"""Parsing a batch of documents one after another, against with parseMany over a pool of workers."""
+import multiprocessing
+from simphtml import parse, isValid, parseMany
+from simphtml.bench import measure, report, sampleDocument
+
+def run():
+	documents = [sampleDocument(8 << 10) for n in range(100)]
+	size = sum(len(document) for document in documents)
+	report('parse, scan', measure(lambda: [parse(document, 'scan') for document in documents]), size, len(documents))
+	report('isValid', measure(lambda: [isValid(document) for document in documents]), size, len(documents))
+	counts = sorted(set([1, 2, multiprocessing.cpu_count()]))
+	for workers in counts:
+		for chunksize in (1, 16):
+			name = 'parseMany, %d workers, chunks of %d' % (workers, chunksize)
+			report(name, measure(lambda: list(parseMany(documents, workers, chunksize))), size, len(documents))
+	for workers in counts:
+		name = 'parseMany validate, %d workers' % workers
+		report(name, measure(lambda: list(parseMany(documents, workers, validateOnly = True))), size, len(documents))
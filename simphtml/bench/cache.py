@@ -0,0 +1,19 @@
+"""Loading parse results from the on-disk cache, against parsing again."""
+import shutil
+import tempfile
+from simphtml import parse, DiskCache
+from simphtml.bench import measure, report, sampleDocument
+
+def run():
+	document = sampleDocument(1 << 20)
+	directory = tempfile.mkdtemp()
+	try:
+		cache = DiskCache(directory)
+		report('parse, scan', measure(lambda: parse(document, 'scan')), len(document))
+		report('parse, scan into cache', measure(lambda: parse(document, 'scan', cache = cache), 1), len(document))
+		report('cached, tree', measure(lambda: parse(document, cache = cache)), len(document))
+		report('cached, tape', measure(lambda: parse(document, cache = cache, layout = 'tape')), len(document))
+		entrySize = sum(size for mtime, size, path in cache.entries())
+		print '%-40s %9.2f MB' % ('cache entry', entrySize / float(1 << 20))
+	finally:
+		shutil.rmtree(directory)
@@ -0,0 +1,29 @@
+"""Deduplicating many near-identical templated documents by their trees."""
+from simphtml import parse
+from simphtml.bench import measure, report
+
+def templatedDocuments(count, variants):
+	"""Returns count documents made from one template, only variants of which
+are distinct."""
+	template = '<page>\n<title>Page %d</title>\n<ul>\n' + '<li>item &amp more<br/></li>\n' * 50 + '</ul>\n</page>\n'
+	return [template % (number % variants) for number in range(count)]
+
+def listDedupe(trees):
+	"""Deduplicates trees by comparing each with every distinct tree so far."""
+	distinct = []
+	for tree in trees:
+		if tree not in distinct:
+			distinct.append(tree)
+	return distinct
+
+def run():
+	documents = templatedDocuments(1000, 20)
+	size = sum(len(document) for document in documents)
+	report('parse', measure(lambda: [parse(document, 'scan') for document in documents], 1), size, len(documents))
+	report('parse, hash consed', measure(lambda: [parse(document, 'scan', hashcons = True) for document in documents], 1),
+	       size, len(documents))
+	trees = [parse(document, 'scan') for document in documents]
+	report('dedupe by comparing', measure(lambda: listDedupe(trees), 1), count = len(trees))
+	# The first run works out the hashes, and later ones find them cached.
+	report('dedupe by set', measure(lambda: set(trees), 1), count = len(trees))
+	report('dedupe by set, hashes cached', measure(lambda: set(trees)), count = len(trees))
@@ -0,0 +1,69 @@
+"""Seeded generator of synthetic documents for the benchmark suite."""
+import random
+import string
+
+def generateDocument(size = 1 << 20, depth = 8, fanout = 4, textRatio = 0.5, escapeDensity = 0.01, idLength = 6,
+                     seed = 0, semicolons = False):
+	"""Returns a valid document of about size characters, the same for the
+same arguments.  The document is a run of top level elements nested depth
+tags deep, where each tag holds fanout elements: the first a nested tag (if
+there is depth left) and the rest each a nested tag, standalone tag or text.
+Once the document reaches size, the tags still open are closed.
+Text makes up about textRatio of the document, and escapes about
+escapeDensity of its text.  Tag ids are idLength characters long, drawn from
+a few dozen ids.  If semicolons is True, escapes end in ';', as the legacy
+parse.py expects them to."""
+	if depth < 1 or fanout < 1 or idLength < 1 or not 0 <= textRatio < 1:
+		raise ValueError('Bad document shape.')
+	rng = random.Random(seed)
+	ids = [rng.choice(string.letters) + ''.join(rng.choice(_idChars) for i in range(idLength - 1))
+	       for n in range(32)]
+	escapes = ('&amp;', '&lt;') if semicolons else ('&amp', '&lt')
+	# Characters of text per character of markup.
+	textPerMarkup = textRatio / (1 - textRatio)
+	pieces = []
+	length = 0
+	markup = 0
+	text = 0
+	# The ids of the open tags, and how many more elements each is to hold.
+	stack = []
+	while length < size or stack:
+		if stack and (stack[-1][1] == 0 or length >= size):
+			piece = '</%s>' % stack.pop()[0]
+		elif not stack or (len(stack) < depth and (stack[-1][1] == fanout or rng.random() < 0.3)):
+			if stack:
+				stack[-1][1] -= 1
+			id = rng.choice(ids)
+			piece = '<%s>' % id
+			stack.append([id, fanout])
+		else:
+			stack[-1][1] -= 1
+			owed = int(textPerMarkup * markup) - text
+			if owed <= 0:
+				piece = '<%s/>' % rng.choice(ids)
+			else:
+				piece = _text(rng, owed, escapeDensity, escapes)
+				text += len(piece)
+				pieces.append(piece)
+				length += len(piece)
+				continue
+		markup += len(piece)
+		pieces.append(piece)
+		length += len(piece)
+	return ''.join(pieces)
+
+_idChars = string.letters + string.digits + '-'
+_words = ('lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit', 'sed', 'do')
+
+def _text(rng, size, escapeDensity, escapes):
+	"""Returns a run of about size characters of text, with escapes in it."""
+	words = []
+	length = 0
+	while length < size:
+		if escapeDensity and rng.random() < escapeDensity * 6:
+			word = rng.choice(escapes)
+		else:
+			word = rng.choice(_words)
+		words.append(word)
+		length += len(word) + 1
+	return ' '.join(words) + rng.choice(' \n')
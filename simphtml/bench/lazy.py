@@ -0,0 +1,32 @@
+"""Reading only the start of a document with the lazy layout, against parsing it all."""
+from simphtml import parse
+from simphtml.bench import measure, report, sampleDocument
+
+def firstSections(tree, count):
+	"""Reads the elements of the first count sections of a sample document."""
+	sections = [elem for elem in tree.elems[1].elems if elem.isElems()]
+	return [section.elems for section in sections[:count]]
+
+def firstElements(tree, count):
+	"""Reads the first count top-level Elems of tree."""
+	return [elem.elems for elem in tree.elems[:count] if elem.isElems()]
+
+def walk(tree):
+	"""Reads every element of tree, nested Elems included."""
+	pending = [tree]
+	while pending:
+		pending.extend(elem for elem in pending.pop().elems if elem.isElems())
+
+def run():
+	document = sampleDocument(1 << 20)
+	report('parse, scan', measure(lambda: parse(document, 'scan'), 1), len(document))
+	report('lazy, pairing pass only', measure(lambda: parse(document, layout = 'lazy')), len(document))
+	report('lazy, first 3 sections', measure(lambda: firstSections(parse(document, layout = 'lazy'), 3)), len(document))
+	report('lazy, every element', measure(lambda: walk(parse(document, layout = 'lazy')), 1), len(document))
+	report('lazy strict, first 3 sections',
+	       measure(lambda: firstSections(parse(document, layout = 'lazy', strict = True), 3)), len(document))
+
+	# The same sections, but at the top level rather than inside one <doc>.
+	sections = document[len('<doc>\n'):-len('</doc>\n')]
+	report('top level: parse, scan', measure(lambda: parse(sections, 'scan'), 1), len(sections))
+	report('top level: lazy, first 3', measure(lambda: firstElements(parse(sections, layout = 'lazy'), 3)), len(sections))
@@ -0,0 +1,20 @@
+"""Parsing and validating the same small fragments over and over, with and without a ParseMemo."""
+from simphtml import parse, isValid, ParseMemo
+from simphtml.bench import measure, report
+
+# Fragments of the kind a page is put together from, each seen many times.
+navigation = '<nav>\n<ul><li><a>Home</a></li><li><a>News &amp Events</a></li><li><a>About</a></li></ul>\n</nav>\n'
+footer = '<footer><p>Copyright 2024.<br/>All rights reserved.</p></footer>\n'
+snippet = '<div><h2>Snippet %d</h2><p>Some text with <em>emphasis</em>.</p></div>\n'
+
+def run():
+	calls = [navigation, footer] * 1000 + [snippet % (n % 20) for n in range(1000)]
+	size = sum(len(call) for call in calls)
+	report('parse, scan', measure(lambda: [parse(call, 'scan') for call in calls]), size, len(calls))
+	memo = ParseMemo()
+	report('memo parse', measure(lambda: [memo.parse(call) for call in calls]), size, len(calls))
+	report('memo parse, tape', measure(lambda: [memo.parse(call, 'tape') for call in calls]), size, len(calls))
+	report('isValid', measure(lambda: [isValid(call) for call in calls]), size, len(calls))
+	memo = ParseMemo()
+	report('memo isValid', measure(lambda: [memo.isValid(call) for call in calls]), size, len(calls))
+	print 'memo hits %d, misses %d, evictions %d' % (memo.hits, memo.misses, memo.evictions)
@@ -0,0 +1,77 @@
+"""Bytes per AST node, for the slotted node classes against __dict__ based ones."""
+import sys
+from simphtml import parse
+from simphtml.bench import sampleDocument
+
+class DictNode(object):
+	"""Stand-in for an AST node that keeps its fields in a __dict__, as all the
+node classes used to."""
+	def __init__(self, fields):
+		self.__dict__.update(fields)
+
+def nodes(tree):
+	"""Generator that yields every distinct node of tree, nested Elems included."""
+	seen = set()
+	pending = [tree]
+	while pending:
+		node = pending.pop()
+		if id(node) in seen:
+			continue
+		seen.add(id(node))
+		yield node
+		if node.isElems():
+			pending.extend(node.elems)
+
+def nodeSize(node):
+	"""Returns the bytes held by node itself: the object, its __dict__ if it has
+one and its list of elements if it is an Elems, but not the text and ids,
+which are the same strings either way."""
+	size = sys.getsizeof(node)
+	if hasattr(node, '__dict__'):
+		size += sys.getsizeof(node.__dict__)
+	if node.isElems():
+		size += sys.getsizeof(node.elems)
+	return size
+
+def dictNodeSize(node):
+	"""Returns what nodeSize would be for node if it kept its fields in a __dict__."""
+	stand = DictNode(dict((name, getattr(node, name)) for name in node._fields))
+	size = sys.getsizeof(stand) + sys.getsizeof(stand.__dict__)
+	if node.isElems():
+		size += sys.getsizeof(node.elems)
+	return size
+
+def nodeBytes(tree, size = nodeSize):
+	"""Returns the total bytes taken by the distinct nodes of tree, and how many
+of them there are."""
+	total = count = 0
+	for node in nodes(tree):
+		total += size(node)
+		count += 1
+	return (total, count)
+
+def bytesPerNode(tree, size = nodeSize):
+	"""Returns the average number of bytes taken by the nodes of tree."""
+	total, count = nodeBytes(tree, size)
+	return float(total) / count
+
+def tapeBytes(tape):
+	"""Returns the bytes taken by the arrays and symbols of a Tape, again leaving
+out the text, which is held once either way."""
+	size = sum(nodes.itemsize * len(nodes) for nodes in
+	           (tape.kindCodes, tape.symbols, tape.starts, tape.lengths, tape.offsets, tape.ends))
+	return size + sys.getsizeof(tape.ids)
+
+def run():
+	document = sampleDocument(1 << 20)
+	tree = parse(document, 'scan')
+	shared = parse(document, 'scan', shared = True)
+	consed = parse(document, 'scan', hashcons = True)
+	tape = parse(document, 'scan', layout = 'tape').tape
+	count = nodeBytes(tree)[1]
+	for name, total in (('__dict__ nodes (before)', nodeBytes(tree, dictNodeSize)[0]),
+	                    ('slotted nodes', nodeBytes(tree)[0]),
+	                    ('slotted nodes, shared tags', nodeBytes(shared)[0]),
+	                    ('slotted nodes, hash consed', nodeBytes(consed)[0]),
+	                    ('tape', tapeBytes(tape))):
+		print '%-40s %9.1f bytes/node %9.2f MB' % (name, float(total) / count, total / float(1 << 20))
@@ -0,0 +1,15 @@
+"""Tokenizing one large document serially, against in parallel over 1 to N worker processes."""
+import multiprocessing
+from simphtml import TokenBuffer
+from simphtml.bench import measure, report, sampleDocument
+
+def run():
+	document = sampleDocument(8 << 20)
+	report('scan, serial', measure(lambda: TokenBuffer.scan(document), 1), len(document))
+	workers = 1
+	while True:
+		name = 'scan, %d workers' % workers
+		report(name, measure(lambda: TokenBuffer.scan(document, workers, 1 << 20), 1), len(document))
+		if workers >= multiprocessing.cpu_count():
+			break
+		workers = min(workers * 2, multiprocessing.cpu_count())
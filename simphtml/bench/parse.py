@@ -0,0 +1,19 @@
+"""Throughput of parse() and match() on very deep and very wide documents."""
+from simphtml import parse, match
+from simphtml.bench import measure, report
+
+def deepDocument(depth):
+	"""Returns a document of depth nested tags around some text."""
+	return '<a>' * depth + 'x' + '</a>' * depth
+
+def wideDocument(width):
+	"""Returns a document of width sibling tags, each holding some text."""
+	return '<a>x</a>' * width
+
+def run():
+	for name, document in (('deep, 100k levels', deepDocument(100000)),
+	                       ('wide, 100k siblings', wideDocument(100000))):
+		report('parse %s' % name, measure(lambda: parse(document, 'scan'), 1), len(document))
+		report('parse %s, tape' % name, measure(lambda: parse(document, 'scan', layout = 'tape'), 1), len(document))
+		tree = parse(document, 'scan')
+		report('match %s' % name, measure(lambda: match(tree), 1), len(document))
@@ -0,0 +1,16 @@
+"""Parsing a document pushed into a PushParser in chunks, against parsing it whole."""
+from simphtml import parse, PushParser
+from simphtml.bench import measure, report, sampleDocument
+
+def push(document, size, build):
+	parser = PushParser(build)
+	for start in xrange(0, len(document), size):
+		parser.feed(document[start:start + size])
+	parser.close()
+
+def run():
+	document = sampleDocument(1 << 20)
+	report('parse, scan', measure(lambda: parse(document, 'scan')), len(document))
+	for size in (4 << 10, 64 << 10):
+		report('push, %dKB chunks' % (size >> 10), measure(lambda: push(document, size, True)), len(document))
+	report('push, 64KB chunks, no tree', measure(lambda: push(document, 64 << 10, False)), len(document))
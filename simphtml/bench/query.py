@@ -0,0 +1,24 @@
+"""Cost of building a tag index while parsing, and of querying it against walking the tree."""
+from simphtml import parse
+from simphtml.bench import measure, report, sampleDocument
+
+def walkFindAll(tree, id):
+	"""Finds the open and standalone tags with the given id by walking the tree."""
+	found = []
+	pending = [tree]
+	while pending:
+		for elem in pending.pop().elems:
+			if elem.isElems():
+				pending.append(elem)
+			elif not (elem.isText() or elem.isCloseTag()) and elem.id == id:
+				found.append(elem)
+	return found
+
+def run():
+	document = sampleDocument(1 << 20)
+	report('parse, scan', measure(lambda: parse(document, 'scan')), len(document))
+	report('parse, scan with index', measure(lambda: parse(document, 'scan', index = True)), len(document))
+	tree = parse(document, 'scan', index = True)
+	for id in ('doc', 'em', 'missing'):
+		report("find '%s' by walking" % id, measure(lambda: walkFindAll(tree, id)))
+		report("find '%s' by index" % id, measure(lambda: tree.findAll(id)))
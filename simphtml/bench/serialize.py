@@ -0,0 +1,34 @@
+"""Throughput of serialize() on large trees, against a recursive concatenating emitter."""
+import os
+from simphtml import parse, serialize
+from simphtml.bench import measure, report, sampleDocument
+from simphtml.bench.parse import deepDocument, wideDocument
+
+def concatenate(elems):
+	"""Emits the simple HTML for elems recursively, by string concatenation, as
+hand written emitters do."""
+	html = ''
+	for elem in elems.elems:
+		if elem.isElems():
+			html += concatenate(elem)
+		elif elem.isText():
+			html += elem.text.replace('&', '&amp').replace('<', '&lt')
+		elif elem.isOpenTag():
+			html += '<' + elem.id + '>'
+		elif elem.isCloseTag():
+			html += '</' + elem.id + '>'
+		else:
+			html += '<' + elem.id + '/>'
+	return html
+
+def run():
+	document = sampleDocument(8 << 20)
+	tree = parse(document, 'scan')
+	report('sample: serialize to a string', measure(lambda: serialize(tree)), len(document))
+	with open(os.devnull, 'w') as out:
+		report('sample: serialize to a file', measure(lambda: serialize(tree, out)), len(document))
+	report('sample: recursive concatenation', measure(lambda: concatenate(tree)), len(document))
+	for name, document in (('deep, 100k levels', deepDocument(100000)),
+	                       ('wide, 100k siblings', wideDocument(100000))):
+		tree = parse(document, 'scan')
+		report('%s: serialize' % name, measure(lambda: serialize(tree)), len(document))
@@ -0,0 +1,188 @@
+"""Tokenize, parse and isValid throughput, and peak memory, for simphtml and the
+legacy parse.py over generated documents of several shapes, with the results
+saved as JSON and compared against a baseline.  Run through the bench script
+(./bench suite) for a report, or as
+
+	python -m simphtml.bench.suite [--size N] [--output FILE] [--baseline FILE] [--threshold F]
+
+to save the results to FILE and compare them with a baseline saved earlier,
+exiting with status 1 if any of them has regressed by more than F."""
+import imp
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+from optparse import OptionParser
+from simphtml import tokenize, parse, isValid
+from simphtml.bench import measure
+from simphtml.bench.generator import generateDocument
+
+# Shapes of document the suite is run over, as generateDocument arguments.
+# The legacy parser recurses once per level of nesting, so the deep shape
+# stays well within Python's recursion limit.
+shapes = (
+	('default', {}),
+	('deep', {'depth': 200, 'fanout': 2}),
+	('wide', {'depth': 2, 'fanout': 200}),
+	('text', {'textRatio': 0.9}),
+	('markup', {'textRatio': 0.1}),
+	('escapes', {'escapeDensity': 0.2}),
+	('long ids', {'idLength': 32}),
+)
+
+# Number of small documents isValid() is timed over, and their size as a fraction of the suite's.
+snippetCount = 256
+snippetFraction = 256
+
+# Difference in peak memory, in MB, too small to count as a regression.
+memoryNoise = 1.0
+
+# Version of the JSON results format.
+resultsVersion = 1
+
+def legacyParser():
+	"""Returns the legacy parse.py module next to the simphtml package, or None if
+it isn't there."""
+	path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'parse.py')
+	if not os.path.exists(path):
+		return None
+	return imp.load_source('legacyparse', path)
+
+def peakMemory(shape, size, target):
+	"""Returns the peak memory, in MB, that target ('tokenize', 'parse' or
+'legacy parse') takes over the document of the given shape and size, on top of
+what the process holds once the document is generated.  It is measured in a
+freshly started interpreter, as a process's peak can't be lowered once it has
+been raised, and a forked one starts out with its parent's."""
+	package = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+	environment = dict(os.environ, PYTHONPATH = os.pathsep.join([package] + filter(None, [os.environ.get('PYTHONPATH')])))
+	output = subprocess.check_output([sys.executable, '-m', 'simphtml.bench.suite', '--size', str(size),
+	                                  '--peak', target, '--shape', shape], env = environment)
+	return float(output)
+
+def _measurePeak(shape, size, target):
+	"""Measures peakMemory in the current process, which should have run nothing
+else, and returns it."""
+	options = dict(shapes)[shape]
+	if target == 'legacy parse':
+		legacy = legacyParser()
+		# The legacy parser's escapes end in ';'.
+		document = generateDocument(size, semicolons = True, **options)
+		function = lambda: legacy.parse(legacy.FileData(document))
+	else:
+		document = generateDocument(size, **options)
+		function = {'tokenize': lambda: tokenize(document, engine = 'scan'),
+		            'parse': lambda: parse(document, 'scan')}[target]
+	before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	function()
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+	# ru_maxrss is in KB on Linux, but bytes on OS X.
+	return peak / float(1 << 20 if sys.platform == 'darwin' else 1 << 10)
+
+def runShape(name, size, repeat = 3):
+	"""Returns the results for documents of size characters of the named shape."""
+	options = dict(shapes)[name]
+	legacy = legacyParser()
+	document = generateDocument(size, **options)
+	snippets = [generateDocument(size / snippetFraction, seed = seed, **options) for seed in range(snippetCount)]
+	megabytes = len(document) / float(1 << 20)
+	results = {}
+	tokenizeDocument = lambda: tokenize(document, engine = 'scan')
+	parseDocument = lambda: parse(document, 'scan')
+	results['tokenize MB/s'] = megabytes / measure(tokenizeDocument, repeat)
+	results['parse MB/s'] = megabytes / measure(parseDocument, repeat)
+	results['isValid docs/s'] = len(snippets) / measure(lambda: [isValid(snippet) for snippet in snippets], repeat)
+	results['tokenize peak MB'] = peakMemory(name, size, 'tokenize')
+	results['parse peak MB'] = peakMemory(name, size, 'parse')
+	if legacy is not None:
+		# The legacy parser's escapes end in ';'.
+		document = generateDocument(size, semicolons = True, **options)
+		snippets = [generateDocument(size / snippetFraction, seed = seed, semicolons = True, **options)
+		            for seed in range(snippetCount)]
+		legacyParse = lambda: legacy.parse(legacy.FileData(document))
+		results['legacy parse MB/s'] = len(document) / float(1 << 20) / measure(legacyParse, repeat)
+		results['legacy isValid docs/s'] = len(snippets) / measure(lambda: [_legacyIsValid(legacy, snippet)
+		                                                                      for snippet in snippets], repeat)
+		results['legacy parse peak MB'] = peakMemory(name, size, 'legacy parse')
+	return results
+
+def _legacyIsValid(legacy, document):
+	"""Returns whether the legacy parser accepts the given document."""
+	try:
+		legacy.parse(legacy.FileData(document))
+		return True
+	except legacy.Error:
+		return False
+
+def runSuite(size = 1 << 20, repeat = 3):
+	"""Runs every shape of the suite and returns the results, ready to be saved
+as JSON."""
+	return {
+		'version': resultsVersion,
+		'python': platform.python_version(),
+		'size': size,
+		'shapes': dict((name, runShape(name, size, repeat)) for name, options in shapes),
+	}
+
+def compare(results, baseline, threshold = 0.1):
+	"""Returns a (shape, metric, baseline value, value, change) tuple for each of
+the results that is worse than in the baseline by more than threshold, as a
+fraction of the baseline.  Throughputs are worse when lower, and peak memory
+when higher (by more than memoryNoise).  Results that aren't in both are
+skipped, as are the legacy parser's, which are only there for reference: it
+never changes, so any change in them is noise."""
+	regressions = []
+	for shape, metrics in sorted(results['shapes'].items()):
+		for metric, value in sorted(metrics.items()):
+			base = baseline['shapes'].get(shape, {}).get(metric)
+			if not base or metric.startswith('legacy '):
+				continue
+			change = (value - base) / base
+			if metric.endswith(' MB'):
+				worse = change if value - base > memoryNoise else 0
+			else:
+				worse = -change
+			if worse > threshold:
+				regressions.append((shape, metric, base, value, change))
+	return regressions
+
+def printResults(results):
+	"""Prints the results, a line per shape and metric."""
+	for name, options in shapes:
+		for metric, value in sorted(results['shapes'][name].items()):
+			print '%-40s %12.2f %s' % ('%s, %s' % (name, metric.rsplit(' ', 1)[0]), value, metric.rsplit(' ', 1)[1])
+
+def run():
+	printResults(runSuite())
+
+if __name__ == '__main__':
+	options = OptionParser(usage = 'python -m simphtml.bench.suite [options]')
+	options.add_option('--size', type = 'int', default = 1 << 20, help = 'size of the documents, in characters')
+	options.add_option('--repeat', type = 'int', default = 3, help = 'number of times each run is timed')
+	options.add_option('--output', metavar = 'FILE', help = 'save the results as JSON to FILE')
+	options.add_option('--baseline', metavar = 'FILE', help = 'compare the results with those saved in FILE')
+	options.add_option('--threshold', type = 'float', default = 0.1,
+	                   help = 'fraction a result may be worse than the baseline by (default 0.1)')
+	# Used by peakMemory to measure in a fresh interpreter.
+	options.add_option('--peak', help = 'print the peak memory of one target over one shape, and nothing else')
+	options.add_option('--shape', default = 'default', help = 'shape of document for --peak')
+	opts, args = options.parse_args()
+	if opts.peak:
+		print _measurePeak(opts.shape, opts.size, opts.peak)
+		sys.exit(0)
+
+	results = runSuite(opts.size, opts.repeat)
+	printResults(results)
+	if opts.output:
+		with open(opts.output, 'w') as f:
+			json.dump(results, f, indent = 1, sort_keys = True)
+	if opts.baseline:
+		with open(opts.baseline) as f:
+			baseline = json.load(f)
+		regressions = compare(results, baseline, opts.threshold)
+		for shape, metric, base, value, change in regressions:
+			print 'Regression: %s, %s: %.2f -> %.2f (%+.0f%%)' % (shape, metric, base, value, change * 100)
+		if regressions:
+			sys.exit(1)
@@ -0,0 +1,37 @@
+"""Cost of joining runs of text on escape-dense documents."""
+from simphtml import tokenize, parse
+from simphtml.parser import Text
+from simphtml.tokens import coalesceText
+from simphtml.bench import measure, report
+
+def escapeDocument(escapes, text = 'a'):
+	"""Returns a document with one paragraph of text holding the given number of
+escapes, each preceded by text."""
+	return '<p>' + (text + '&amp' + text + '&lt') * (escapes / 2) + '</p>\n'
+
+def pairwiseMerge(tokens):
+	"""Joins runs of text the way the parser used to, replacing the last Text
+node with a new one holding its text plus each further piece."""
+	elems = []
+	merging = False
+	for token in tokens:
+		if not token.isTextToken():
+			merging = False
+		elif merging:
+			elems[-1] = Text(elems[-1].text + token.text)
+		else:
+			elems.append(Text(token.text))
+			merging = True
+	return elems
+
+def run():
+	for escapes, text in ((2000, 'a'), (20000, 'a'), (20000, 'some text '), (100000, '')):
+		document = escapeDocument(escapes, text)
+		name = '%d escapes, %d char pieces' % (escapes, len(text))
+		tokens = tokenize(document, engine = 'scan')
+		report(name + ': pairwise Text merge', measure(lambda: pairwiseMerge(tokens)), len(document))
+		report(name + ': coalesceText', measure(lambda: list(coalesceText(tokens))), len(document))
+		report(name + ': tokenize, scan', measure(lambda: tokenize(document, engine = 'scan')), len(document))
+		report(name + ': tokenize, scan coalesced',
+		       measure(lambda: tokenize(document, engine = 'scan', coalesce = True)), len(document))
+		report(name + ': parse, scan', measure(lambda: parse(document, 'scan')), len(document))
@@ -0,0 +1,15 @@
+"""Throughput of isValid() with the dedicated validator against validating by parsing."""
+from simphtml import isValid
+from simphtml.bench import measure, report, sampleDocument
+
+def run():
+	document = sampleDocument(1 << 20)
+	report('isValid, parse() with dfa', measure(lambda: isValid(document, 'dfa'), 1), len(document))
+	report('isValid, parse() with scan', measure(lambda: isValid(document, 'scan')), len(document))
+	report('isValid, validator', measure(lambda: isValid(document)), len(document))
+
+	snippets = [sampleDocument(300)] * 5000
+	report('isValid x5000 snippets, parse() with scan',
+	       measure(lambda: [isValid(snippet, 'scan') for snippet in snippets]), count = len(snippets))
+	report('isValid x5000 snippets, validator',
+	       measure(lambda: [isValid(snippet) for snippet in snippets]), count = len(snippets))
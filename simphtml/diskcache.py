@@ -0,0 +1,124 @@
+import errno
+import hashlib
+import os
+import struct
+import zlib
+
+# Header of a cache entry: magic, format version, CRC-32 and size of the
+# compressed data.
+_entryHeader = '<4sHIQ'
+_entryMagic = 'SHCE'
+_entryVersion = 1
+_entrySuffix = '.entry'
+
+class DiskCache(object):
+	"""Directory of cached data, one file per entry, keyed by a hash of the
+content the data was made from (see key).  The directory is kept under
+maxSize bytes by removing the least recently used entries whenever one is
+added; an entry's modification time is updated each time it is read.
+
+Entries are compressed with zlib, at its fastest level.  Each entry is
+checked on reading against a header giving its format version and the size
+and CRC-32 of its compressed data.  An entry that doesn't match (a partly
+written or damaged file, or one from another version) is removed and treated
+as missing.  Entries are written to a temporary file and renamed into
+place, so readers never see one half written."""
+	def __init__(self, directory, maxSize = 256 << 20):
+		self.directory = directory
+		self.maxSize = maxSize
+		if not os.path.isdir(directory):
+			os.makedirs(directory)
+
+	@staticmethod
+	def key(source):
+		"""Returns the key for data made from source, a string, unicode string or
+buffer (such as an mmap)."""
+		if isinstance(source, unicode):
+			return 'u' + hashlib.sha1(source.encode('utf-8')).hexdigest()
+		return hashlib.sha1(source).hexdigest()
+
+	def get(self, key):
+		"""Returns the data cached for key, or None."""
+		path = self._path(key)
+		try:
+			with open(path, 'rb') as f:
+				entry = f.read()
+		except IOError as e:
+			if e.errno == errno.ENOENT:
+				return None
+			raise
+		data = self._check(entry)
+		if data is None:
+			self.remove(key)
+			return None
+		try:
+			os.utime(path, None)
+		except OSError:
+			pass
+		return data
+
+	def put(self, key, data):
+		"""Caches data for key, then removes entries until the cache fits in maxSize."""
+		path = self._path(key)
+		temporary = '%s.%d.tmp' % (path, os.getpid())
+		data = zlib.compress(data, 1)
+		with open(temporary, 'wb') as f:
+			f.write(struct.pack(_entryHeader, _entryMagic, _entryVersion, zlib.crc32(data) & 0xffffffff, len(data)))
+			f.write(data)
+		os.rename(temporary, path)
+		self._evict()
+
+	def remove(self, key):
+		"""Removes the entry for key, if there is one."""
+		try:
+			os.remove(self._path(key))
+		except OSError as e:
+			if e.errno != errno.ENOENT:
+				raise
+
+	def entries(self):
+		"""Returns a list of (modification time, size, path) for each entry."""
+		entries = []
+		for name in os.listdir(self.directory):
+			if name.endswith(_entrySuffix):
+				path = os.path.join(self.directory, name)
+				try:
+					stat = os.stat(path)
+				except OSError:
+					continue
+				entries.append((stat.st_mtime, stat.st_size, path))
+		return entries
+
+	def _path(self, key):
+		return os.path.join(self.directory, key + _entrySuffix)
+
+	def _check(self, entry):
+		"""Returns the data held in the given entry, or None if it is damaged or
+from another version."""
+		headerSize = struct.calcsize(_entryHeader)
+		if len(entry) < headerSize:
+			return None
+		magic, version, crc, size = struct.unpack(_entryHeader, entry[:headerSize])
+		data = entry[headerSize:]
+		if magic != _entryMagic or version != _entryVersion or size != len(data):
+			return None
+		if zlib.crc32(data) & 0xffffffff != crc:
+			return None
+		try:
+			return zlib.decompress(data)
+		except zlib.error:
+			return None
+
+	def _evict(self):
+		"""Removes the least recently used entries until the cache fits in maxSize."""
+		entries = self.entries()
+		total = sum(size for mtime, size, path in entries)
+		entries.sort()
+		for mtime, size, path in entries:
+			if total <= self.maxSize:
+				break
+			try:
+				os.remove(path)
+			except OSError:
+				pass
+			total -= size
@@ -1,10 +1,19 @@
 from tokens import TokenizeError
 
 class MatchError(Exception):
-	"""Error class for providing line/col where match errors occur."""
-	def __init__(self, reason):
-		Exception.__init__(self, reason)
+	"""Error class for providing line/col where match errors occur.  The line and
+col are those of the offending tag, and are None for trees built by hand."""
+	def __init__(self, reason, line = None, col = None):
+		Exception.__init__(self, reason, line, col)
 		self.reason = reason
+		self.line = line
+		self.col = col
+
+	@classmethod
+	def at(cls, reason, tag):
+		"""Returns a MatchError positioned at the given tag."""
+		line, col = tag.position()
+		return cls(reason, line, col)
 
 def match(tree):
 	"""Performs a semantic analysis pass on an HtmlElem tree to determine if the
@@ -13,27 +22,37 @@ of the given gree are not properly matched.  Returns the given tree unchanged.""
 	if tree.isElems():
 		matchElems(tree.elems)
 	elif tree.isOpenTag():
-		raise MatchError("Open tag '%s' has no corresponding close tag." % tree.id)
+		raise MatchError.at("Open tag '%s' has no corresponding close tag." % tree.id, tree)
 	elif tree.isCloseTag():
-		raise MatchError("Close tag '%s' has no corresponding opening tag." % tree.id)
+		raise MatchError.at("Close tag '%s' has no corresponding opening tag." % tree.id, tree)
 	return tree
 
 def matchElems(elems):
-	"""Match the given sequence of HtmlElem nodes."""
-	# Keep track of the current open tag id
-	openId = None
-	for elem in elems:
-		if elem.isElems():
-			if openId is not None: match(elem)
-			else: raise MatchError('Elems nesting found without previous open tag.')
-		elif elem.isOpenTag():
-			openId = elem.id
-		elif elem.isCloseTag():
-			if openId is None:
-				raise MatchError("Close tag '%s' with no matching open tag." % elem.id)
-			else:
-				if openId != elem.id:
-					raise MatchError("Close tag '%s' does not match open tag '%s'." % (elem.id, openId))
-				openId = None
-	if openId is not None:
-		raise MatchError("Missing close tag for open tag '%s'." % openId)
+	"""Match the given sequence of HtmlElem nodes, and every Elems nested in it.
+Nested Elems are walked with an explicit stack rather than by recursion."""
+	# Iterators over the elems of each level being matched, and the current open tag of each.
+	levels = [iter(elems)]
+	openTags = [None]
+	while levels:
+		for elem in levels[-1]:
+			if elem.isElems():
+				if openTags[-1] is None:
+					raise MatchError('Elems nesting found without previous open tag.')
+				levels.append(iter(elem.elems))
+				openTags.append(None)
+				break
+			elif elem.isOpenTag():
+				openTags[-1] = elem
+			elif elem.isCloseTag():
+				openTag = openTags[-1]
+				if openTag is None:
+					raise MatchError.at("Close tag '%s' with no matching open tag." % elem.id, elem)
+				else:
+					if openTag.id != elem.id:
+						raise MatchError.at("Close tag '%s' does not match open tag '%s'." % (elem.id, openTag.id), elem)
+					openTags[-1] = None
+		else:
+			levels.pop()
+			openTag = openTags.pop()
+			if openTag is not None:
+				raise MatchError.at("Missing close tag for open tag '%s'." % openTag.id, openTag)
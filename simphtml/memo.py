@@ -0,0 +1,108 @@
+import copy
+import threading
+from collections import OrderedDict
+from tokens import TokenizeError, _source
+from matcher import MatchError
+from parser import SimpHtmlParser, ParseError
+from validator import validate
+from diskcache import DiskCache
+
+# Bytes counted for each entry besides its Tape, for its key and bookkeeping.
+_entryOverhead = 200
+
+class ParseMemo(object):
+	"""In-memory memo of the results of parse() and isValid(), for services that
+see the same documents over and over.  Documents are keyed by a digest of
+their text, and at most maxEntries results taking about maxBytes are kept,
+evicting the least recently used first.  The hits, misses and evictions
+attributes count how the memo has fared.
+
+A parsed document is kept as a Tape, from which each call to parse builds a
+new tree, so callers are free to do what they like with the trees they get.
+A document that fails to parse is kept as its error, and each call raises a
+copy of that error, with the same type, reason and position."""
+	def __init__(self, maxEntries = 1024, maxBytes = 64 << 20):
+		self.maxEntries = maxEntries
+		self.maxBytes = maxBytes
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self._bytes = 0
+		# (result, size) for each key, least recently used first.
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	def parse(self, lines, layout = 'tree'):
+		"""Returns what parse() would for the given document, with a layout of
+'tree' or 'tape', and raises the same errors."""
+		if layout not in ('tree', 'tape'):
+			raise ValueError("Only the 'tree' and 'tape' layouts can be memoized.")
+		source = _source(lines)
+		key = ('parse', DiskCache.key(source))
+		result = self._get(key)
+		if result is None:
+			try:
+				result = SimpHtmlParser('scan').parseTape(source)
+				size = result.byteSize()
+			except (MatchError, ParseError, TokenizeError) as e:
+				result = e
+				size = 0
+			self._put(key, result, size)
+		if isinstance(result, Exception):
+			raise copy.copy(result)
+		return result.root() if layout == 'tape' else result.tree()
+
+	def isValid(self, lines):
+		"""Returns what isValid() would for the given document.  A document that
+has been parsed is known to be valid or not without a memo of its own."""
+		source = _source(lines)
+		digest = DiskCache.key(source)
+		parsed = self._get(('parse', digest), False)
+		if parsed is not None:
+			return not isinstance(parsed, Exception)
+		key = ('isValid', digest)
+		valid = self._get(key)
+		if valid is None:
+			valid = validate(source)
+			self._put(key, valid, 0)
+		return valid
+
+	def clear(self):
+		"""Forgets every result, but not the counts."""
+		with self._lock:
+			self._entries.clear()
+			self._bytes = 0
+
+	def __len__(self):
+		return len(self._entries)
+
+	def byteSize(self):
+		"""Returns about how many bytes the memoized results take."""
+		return self._bytes
+
+	def _get(self, key, countMiss = True):
+		"""Returns the result for key, making it the most recently used, or None."""
+		with self._lock:
+			entry = self._entries.pop(key, None)
+			if entry is None:
+				if countMiss:
+					self.misses += 1
+				return None
+			self._entries[key] = entry
+			self.hits += 1
+			return entry[0]
+
+	def _put(self, key, result, size):
+		"""Adds the result for key, evicting the least recently used results until
+the memo is within its bounds again."""
+		size += _entryOverhead
+		with self._lock:
+			old = self._entries.pop(key, None)
+			if old is not None:
+				self._bytes -= old[1]
+			self._entries[key] = (result, size)
+			self._bytes += size
+			while self._entries and (len(self._entries) > self.maxEntries or self._bytes > self.maxBytes):
+				evicted, (result, size) = self._entries.popitem(last = False)
+				self._bytes -= size
+				self.evictions += 1
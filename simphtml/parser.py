@@ -1,19 +1,125 @@
-from tokens import tokenize, TokenizeError
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import izip
+from tokens import tokenize, coalesceText, TokenizeError, TokenBuffer, ScanTokenStream, IdToken, _chunks, _source
+from positions import LineIndex, Located
+from tagindex import TagIndex
+from diskcache import DiskCache
 from matcher import match, MatchError
+from validator import validate
 
-def isValid(lines):
-	"""Returns True if the given text lines are properly formatted simple HTML, False otherwise."""
+def iterparse(lines, engine = 'dfa'):
+	"""Returns an iterator of parse events for the given text lines, without
+building an AST.  The events are ('start', id) for an open tag, ('end', id)
+for its close tag, ('standalone', id) and ('text', text), where each text
+event holds a whole (unescaped) run of text.  Raises the same ParseError,
+TokenizeError and MatchError conditions as parse(), but as soon as they are
+reached, so a mismatched close tag fails before the rest of the document is
+read."""
+	return SimpHtmlEventParser(engine).events(lines)
+
+def isValid(lines, engine = None):
+	"""Returns True if the given text lines are properly formatted simple HTML, False otherwise.
+Unless a tokenizer engine is named, this uses the dedicated validator, which
+builds no tokens or AST; otherwise the document is parsed with that engine."""
+	if engine is None:
+		return validate(lines)
 	try:
-		parse(lines)
+		parse(lines, engine)
 		return True
 	except (MatchError, ParseError, TokenizeError):
 		return False
 
-def parse(lines):
+def parse(lines, engine = 'dfa', shared = False, layout = 'tree', hashcons = False, strict = False, index = False,
+          cache = None, recover = False):
 	"""Parses the given text lines and returns an AST that represents the simple
 HTML document from the text.  Raises a ParseError if parsing fails.  Raises a
-TokenizeError if tokenizing fails."""
-	return match(SimpHtmlParser().parse(lines))
+TokenizeError if tokenizing fails.  Raises a MatchError, as soon as the
+offending tag is reached, if the tags are not properly matched.  The engine
+selects the tokenizer (see tokenize).
+
+If shared is True, all the CloseTags with the same id are one and the same
+instance, as are the StandaloneTags, and every tag id is stored once.  The
+shared tags carry no position.
+
+If layout is 'tape', the document is parsed into a flat Tape instead of a
+tree of nodes, and the root of the Tape is returned: an Elems that compares
+equal to the tree, but whose nodes are only created as they are visited.
+
+If hashcons is True, every set of equal subtrees in the tree (text, tags and
+Elems alike) is one and the same instance, so repeated blocks of a document
+are only held once.  None of the tags carry a position.
+
+If layout is 'lazy', the Elems returned, and every Elems nested in it, only
+parse their own elements when those are first asked for (see LazyDocument).
+Errors are then raised as the part of the document holding them is reached,
+unless strict is True, in which case the whole document is checked first.
+The shared and hashcons options only apply to the 'tree' layout.
+
+If index is True, a TagIndex of the open and standalone tags is built as the
+document is parsed, and the Elems returned is an IndexedElems that can be
+queried through it, as in tree.findAll('b').  This is only available with the
+'tree' layout.
+
+If cache is a directory (or DiskCache), the document is parsed into a Tape
+that is saved there, keyed by a hash of the document, and loaded again the
+next time the same document is parsed with the cache.  The tree is then
+rebuilt from the Tape, unless layout is 'tape'.  The cache can only be used
+with the 'tree' and 'tape' layouts, and without the shared, hashcons or index
+options.  Documents that fail to parse are not cached.
+
+If recover is True, errors are collected rather than raised, and parsing
+carries on after each one, in the same single pass over the document.  A
+(tree, errors) pair is returned, where the tree is a best effort at the
+document and errors lists every TokenizeError, ParseError and MatchError
+found, in document order (see SimpHtmlParser.recover).  Recovery uses the
+scanning tokenizer, and is only available with the 'tree' layout and no
+cache."""
+	if recover:
+		if layout != 'tree' or cache is not None:
+			raise ValueError('Errors can only be recovered from with the tree layout and no cache.')
+		return SimpHtmlParser('scan', shared, hashcons, index).recover(lines)
+	if index and layout != 'tree':
+		raise ValueError("A tag index can't be built for the '%s' layout." % layout)
+	if cache is not None:
+		if layout not in ('tree', 'tape') or shared or hashcons or index:
+			raise ValueError('Only plain tree and tape layouts can be cached.')
+		tape = _cachedTape(lines, engine, cache)
+		return tape.root() if layout == 'tape' else tape.tree()
+	if layout == 'tape':
+		return SimpHtmlParser(engine).parseTape(lines).root()
+	elif layout == 'lazy':
+		document = LazyDocument(lines)
+		if strict and not validate(document.source):
+			# Parse the document to raise the error, with its position.
+			for event in iterparse(document.source, engine):
+				pass
+		return document.root()
+	elif layout != 'tree':
+		raise ValueError("Unknown AST layout '%s'." % layout)
+	return SimpHtmlParser(engine, shared, hashcons, index).parse(lines)
+
+def _cachedTape(lines, engine, cache):
+	"""Returns the Tape for the given document from cache, a directory or
+DiskCache, parsing it and adding it to the cache if it isn't there (or the
+cached copy can't be loaded)."""
+	if not isinstance(cache, DiskCache):
+		cache = DiskCache(cache)
+	source = _source(lines)
+	key = cache.key(source)
+	data = cache.get(key)
+	if data is not None:
+		try:
+			return Tape.loads(data)
+		except ValueError:
+			cache.remove(key)
+	tape = SimpHtmlParser(engine).parseTape(source)
+	cache.put(key, tape.dumps())
+	return tape
 
 class ParseError(Exception):
 	"""Error class for providing line/col where parse errors occur."""
@@ -24,10 +130,40 @@ class ParseError(Exception):
 		self.col = col
 
 class HtmlElem(object):
-	"""Base HTML element class."""
+	"""Base HTML element class.  Elements keep their fields in __slots__ rather
+than a __dict__, as a large document has a great many of them; _fields names
+the fields of each class, which are compared for equality and pickled.
+
+Elements hash by structure, so equal elements (and trees) hash the same and
+can be used as dict keys and set members.  The hash is worked out the first
+time it is needed and cached, so elements must not be changed after that."""
+	# The cached hash, once it has been worked out.
+	__slots__ = ('_hash',)
+	_fields = ()
+
 	def __eq__(self, other):
-		return (isinstance(other, self.__class__) and
-		        self.__dict__ == other.__dict__)
+		return isinstance(other, self.__class__)
+
+	def __ne__(self, other):
+		return not self.__eq__(other)
+
+	def __hash__(self):
+		try:
+			return self._hash
+		except AttributeError:
+			self._hash = hash(self._key())
+			return self._hash
+
+	def _key(self):
+		"""Returns the tuple of what this element is compared on, to hash."""
+		return (self.__class__,)
+
+	def __getstate__(self):
+		return tuple([getattr(self, name) for name in self._fields])
+
+	def __setstate__(self, state):
+		for name, value in izip(self._fields, state):
+			setattr(self, name, value)
 
 	def __str__(self):
 		return '%s()' % self.__class__.__name__
@@ -42,6 +178,8 @@ class HtmlElem(object):
 
 class Elems(HtmlElem):
 	"""Ordered sequence of HTML elements."""
+	__slots__ = _fields = ('elems',)
+
 	def __init__(self, elems = None):
 		self.elems = elems if elems else []
 
@@ -51,12 +189,71 @@ class Elems(HtmlElem):
 	def __repr__(self):
 		return '%s(%s)' % (self.__class__.__name__, str(self.elems))
 
+	def __eq__(self, other):
+		"""Compares two trees level by level, without recursing into nested Elems,
+so arbitrarily deep trees can be compared."""
+		pending = [(self, other)]
+		while pending:
+			elems, others = pending.pop()
+			if not isinstance(others, Elems):
+				return False
+			if elems._hashed() and others._hashed() and elems._hash != others._hash:
+				return False
+			elems = elems.elems
+			others = others.elems
+			if len(elems) != len(others):
+				return False
+			for elem, otherElem in izip(elems, others):
+				if elem is otherElem:
+					continue
+				elif elem.isElems():
+					pending.append((elem, otherElem))
+				elif elem != otherElem:
+					return False
+		return True
+
+	def __hash__(self):
+		"""Hashes the nested Elems bottom up, rather than recursing into them, so
+arbitrarily deep trees can be hashed."""
+		if self._hashed():
+			return self._hash
+		# Elems to hash, parents before their children, with their elements.
+		unhashed = []
+		pending = [self]
+		while pending:
+			elems = pending.pop()
+			children = elems.elems
+			unhashed.append((elems, children))
+			for elem in children:
+				if elem.isElems() and not elem._hashed():
+					pending.append(elem)
+		for elems, children in reversed(unhashed):
+			elems._hash = hash((Elems, tuple([hash(elem) for elem in children])))
+		return self._hash
+
+	def _hashed(self):
+		"""Returns whether the hash has been worked out yet."""
+		return hasattr(self, '_hash')
+
 	def isElems(self): return True
 
-class BaseTag(HtmlElem):
-	"""Base class for HTML tag elements."""
-	def __init__(self, id):
+class BaseTag(HtmlElem, Located):
+	"""Base class for HTML tag elements.  Tags produced by the parser also carry
+the offset of their IdToken, so match errors can report where they are; this
+plays no part in comparing tags."""
+	__slots__ = ('id', 'offset', 'index')
+	_fields = __slots__
+
+	def __init__(self, id, offset = None, index = None):
 		self.id = id
+		self.offset = offset
+		self.index = index
+
+	def __eq__(self, other):
+		return isinstance(other, self.__class__) and self.id == other.id
+
+	def _key(self):
+		return (self.__class__, self.id)
 
 	def __str__(self):
 		return '%s(%s)' % (self.__class__.__name__, self.id)
@@ -65,16 +262,27 @@ class BaseTag(HtmlElem):
 		return "%s('%s')" % (self.__class__.__name__, self.id)
 
 class OpenTag(BaseTag):
+	__slots__ = ()
 	def isOpenTag(self): return True
 class CloseTag(BaseTag):
+	__slots__ = ()
 	def isCloseTag(self): return True
-class StandaloneTag(BaseTag): pass
+class StandaloneTag(BaseTag):
+	__slots__ = ()
 
 class Text(HtmlElem):
 	"""Simple text container."""
+	__slots__ = _fields = ('text',)
+
 	def __init__(self, text):
 		self.text = text
 
+	def __eq__(self, other):
+		return isinstance(other, self.__class__) and self.text == other.text
+
+	def _key(self):
+		return (Text, self.text)
+
 	def __str__(self):
 		return '%s(%s)' % (self.__class__.__name__, self.text)
 
@@ -83,9 +291,582 @@ class Text(HtmlElem):
 
 	def isText(self): return True
 
-class SimpHtmlParser(object):
-	"""Implements a DFA (state machine) that processes a token stream and produces
-an AST.
+class Tape(object):
+	"""Flat, array-backed encoding of an AST.  Each node, in document order, is
+stored as a kind code in parallel arrays with the symbol of its tag id, the
+start and length of its text in one string of all the document's text, the
+offset of its tag and the index just past its subtree.  An Elems node's
+elements follow it up to that end index, so a subtree is skipped by jumping
+straight to its end.
+
+Nodes are only created when the Tape is indexed, and the Elems it hands out
+are views that create their elements when they are asked for, so that a
+Tape compares equal to the tree parse() would have built.  The whole Tape
+pickles as a handful of arrays and strings."""
+	# Node class for each kind code.
+	kinds = (Elems, OpenTag, CloseTag, StandaloneTag, Text)
+
+	def __init__(self, index = None):
+		self.kindCodes = array('B')
+		# Index into ids of each tag's id, or -1.
+		self.symbols = array('l')
+		# Start and length in textStore of each Text's text.
+		self.starts = array('l')
+		self.lengths = array('l')
+		# Offset of each tag's IdToken, or -1.
+		self.offsets = array('l')
+		self.ends = array('l')
+		self.ids = []
+		self.textStore = ''
+		self.index = index
+
+	def __len__(self):
+		return len(self.kindCodes)
+
+	def __getitem__(self, node):
+		"""Returns a view of the node at the given index."""
+		nodeClass = self.kinds[self.kindCodes[node]]
+		if nodeClass is Elems:
+			return ElemsView(self, node)
+		elif nodeClass is Text:
+			return Text(self.text(node))
+		offset = self.offsets[node]
+		if offset < 0:
+			return nodeClass(self.id(node))
+		return nodeClass(self.id(node), offset, self.index)
+
+	def root(self):
+		"""Returns a view of the Elems at the root of the document."""
+		return self[0]
+
+	def kind(self, node):
+		"""Returns the node class of the node at the given index without creating it."""
+		return self.kinds[self.kindCodes[node]]
+
+	def id(self, node):
+		"""Returns the id of the tag at the given index."""
+		return self.ids[self.symbols[node]]
+
+	def text(self, node):
+		"""Returns the text of the Text at the given index."""
+		start = self.starts[node]
+		return self.textStore[start:start + self.lengths[node]]
+
+	def end(self, node):
+		"""Returns the index just past the subtree of the node at the given index."""
+		return self.ends[node]
+
+	def children(self, node):
+		"""Generator that yields the index of each element of the Elems at the given
+index, jumping over their subtrees."""
+		child = node + 1
+		end = self.ends[node]
+		ends = self.ends
+		while child < end:
+			yield child
+			child = ends[child]
+
+	def tree(self):
+		"""Returns the tree of nodes the Tape encodes, just as parse() builds it."""
+		ends = self.ends
+		elemsCode = _tapeCodes[Elems]
+		# Elements of the innermost Elems, and of each enclosing one, with the
+		# index at which each ends.
+		elems = []
+		end = ends[0]
+		enclosing = []
+		node = 1
+		while True:
+			while node == end:
+				if not enclosing:
+					return Elems(tuple(elems))
+				nested = Elems(tuple(elems))
+				elems, end = enclosing.pop()
+				elems.append(nested)
+			if self.kindCodes[node] == elemsCode:
+				enclosing.append((elems, end))
+				elems = []
+				end = ends[node]
+			else:
+				elems.append(self[node])
+			node += 1
+
+	def byteSize(self):
+		"""Returns the number of bytes held in the Tape's arrays, ids and text."""
+		size = sum(nodes.itemsize * len(nodes) for nodes in
+		           (self.kindCodes, self.symbols, self.starts, self.lengths, self.offsets, self.ends))
+		if self.index is not None:
+			starts = self.index.lineStarts()
+			size += starts.itemsize * len(starts)
+		return size + sum(len(id) for id in self.ids) + len(self.textStore)
+
+	def dumps(self):
+		"""Returns the Tape encoded as a string of bytes, for Tape.loads.  This is
+an array dump, so it can only be loaded on a machine of the same kind."""
+		unicodeText = isinstance(self.textStore, unicode)
+		ids = '\0'.join(self.ids)
+		text = self.textStore
+		if unicodeText:
+			ids = ids.encode('utf-8')
+			text = text.encode('utf-8')
+		starts = self.index.lineStarts() if self.index is not None else array('l')
+		header = struct.pack(_tapeHeader, _tapeMagic, _tapeVersion, array('l').itemsize, sys.byteorder == 'little',
+		                     unicodeText, len(self), len(ids), len(text), len(starts))
+		return ''.join([header, self.kindCodes.tostring(), self.symbols.tostring(), self.starts.tostring(),
+		                self.lengths.tostring(), self.offsets.tostring(), self.ends.tostring(),
+		                starts.tostring(), ids, text])
+
+	@classmethod
+	def loads(cls, data):
+		"""Returns the Tape encoded in the given string of bytes by dumps.  Raises a
+ValueError if it isn't a whole Tape of this version for this kind of machine."""
+		headerSize = struct.calcsize(_tapeHeader)
+		if len(data) < headerSize:
+			raise ValueError('Truncated Tape header.')
+		magic, version, itemSize, little, unicodeText, count, idsSize, textSize, lineCount = \
+			struct.unpack(_tapeHeader, data[:headerSize])
+		if magic != _tapeMagic or version != _tapeVersion:
+			raise ValueError('Not a version %d Tape.' % _tapeVersion)
+		if itemSize != array('l').itemsize or little != (sys.byteorder == 'little'):
+			raise ValueError('Tape was written on a different kind of machine.')
+		if len(data) != headerSize + count * (1 + 5 * itemSize) + lineCount * itemSize + idsSize + textSize:
+			raise ValueError('Tape is the wrong size.')
+		tape = cls()
+		position = headerSize
+		for nodes, size in ((tape.kindCodes, count), (tape.symbols, count), (tape.starts, count),
+		                    (tape.lengths, count), (tape.offsets, count), (tape.ends, count)):
+			end = position + size * nodes.itemsize
+			nodes.fromstring(data[position:end])
+			position = end
+		starts = array('l')
+		end = position + lineCount * itemSize
+		starts.fromstring(data[position:end])
+		ids = data[end:end + idsSize]
+		text = data[end + idsSize:]
+		if unicodeText:
+			ids = ids.decode('utf-8')
+			text = text.decode('utf-8')
+		tape.ids = ids.split('\0') if ids else []
+		tape.textStore = text
+		if lineCount:
+			tape.index = LineIndex.fromStarts(starts)
+		return tape
+
+class ElemsView(Elems):
+	"""An Elems node of a Tape, whose elements are created each time they are
+asked for rather than stored."""
+	__slots__ = _fields = ('tape', 'node')
+
+	def __init__(self, tape, node):
+		self.tape = tape
+		self.node = node
+
+	@property
+	def elems(self):
+		tape = self.tape
+		# Like Elems, an empty view holds a list.
+		return tuple([tape[child] for child in tape.children(self.node)]) or []
+
+	def __repr__(self):
+		return 'Elems(%s)' % str(self.elems)
+
+# A tag as the skeleton pass of LazyDocument finds it, with groups for the
+# slash of a close tag and the slash of a standalone tag.
+_skeletonTag = re.compile(r'<\s*(/?)[^<>/]*?(/?)\s*>')
+
+class LazyDocument(object):
+	"""A document that is parsed one level at a time, as its elements are asked for.
+
+A single pass over the document first pairs up its open and close tags,
+finding them with one regular expression and counting how they nest, without
+tokenizing anything.  Each Elems is a LazyElems that tokenizes and parses
+just its own level the first time its elements are asked for, jumping from
+each nested open tag straight to its close tag and leaving what was in
+between to another LazyElems.
+
+The pairing is only a guide to what can be jumped over: each level is fully
+checked as it is parsed, so an error is raised, with its line/col, when the
+level holding it is reached.  A tag the pass couldn't pair is parsed along
+with the rest of its level instead."""
+	def __init__(self, lines):
+		self.source = _source(lines)
+		self.index = LineIndex(self.source)
+		# Offset of each open tag, in order, and of its close tag (or -1).
+		self.opens = array('l')
+		self.closes = array('l')
+		openings = []
+		for match in _skeletonTag.finditer(self.source):
+			if match.group(1):
+				if openings:
+					self.closes[openings.pop()] = match.start()
+			elif not match.group(2):
+				openings.append(len(self.opens))
+				self.opens.append(match.start())
+				self.closes.append(-1)
+		self._parser = SimpHtmlEventParser('scan')
+
+	def root(self):
+		"""Returns the Elems at the root of the document."""
+		return LazyElems(self, 0, len(self.source))
+
+	def closeOf(self, start):
+		"""Returns the offset of the close tag paired with the open tag at offset
+start, or None if there isn't one."""
+		i = bisect_left(self.opens, start)
+		if i < len(self.opens) and self.opens[i] == start and self.closes[i] >= 0:
+			return self.closes[i]
+		return None
+
+	def parseLevel(self, start, stop):
+		"""Parses the level of the document from offset start up to the close tag
+at offset stop (or the end of the document), returning its elements."""
+		elems = []
+		enclosing = []
+		# The contents of the last tag jumped over, until its close tag is reached.
+		skipped = []
+		for kind, value in self._parser._events(self._levelTokens(start, stop, skipped)):
+			if kind == 'text':
+				elems.append(Text(value))
+			elif kind == 'start':
+				elems.append(OpenTag(value.id, value.offset, value.index))
+				enclosing.append(elems)
+				elems = []
+			elif kind == 'end':
+				nested = elems
+				elems = enclosing.pop()
+				if nested:
+					elems.append(Elems(tuple(nested)))
+				elif skipped:
+					elems.append(LazyElems(self, *skipped.pop()))
+				elems.append(CloseTag(value.id, value.offset, value.index))
+			else:
+				elems.append(StandaloneTag(value.id, value.offset, value.index))
+		return tuple(elems)
+
+	def _levelTokens(self, start, stop, skipped):
+		"""Generator that yields the coalesced tokens of a level, jumping from each
+paired open tag to its close tag and appending the (start, stop) of what was
+jumped over to skipped."""
+		source = self.source
+		flush = stop == len(source)
+		# A nested level takes in the '<' of its close tag as well, so that
+		# everything before it ends just as it does in the whole document.
+		end = stop if flush else stop + 1
+		position = start
+		while position is not None:
+			if isinstance(source, unicode):
+				chunk = source[position:end]
+			else:
+				chunk = buffer(source, position, end - position)
+			stream = ScanTokenStream([chunk], self.index)
+			stream._base = position
+			jump = None
+			# The two tokens before the current one, to spot open tags by.
+			before = last = None
+			for token in stream.textRuns(flush):
+				yield token
+				if token.isGtToken() and last is not None and last.isIdToken() and before.isLtToken():
+					close = self.closeOf(before.offset - 1)
+					if close is not None and close > token.offset:
+						skipped.append((token.offset, close))
+						jump = close
+						break
+				before, last = last, token
+			position = jump
+
+class IndexedElems(Elems):
+	"""The Elems at the root of a document parsed with a TagIndex, which can be
+queried through it."""
+	__slots__ = ('tagIndex',)
+	_fields = ('elems', 'tagIndex')
+
+	def __init__(self, elems, tagIndex):
+		Elems.__init__(self, elems)
+		self.tagIndex = tagIndex
+
+	def findAll(self, id):
+		"""Returns a tuple of the open and standalone tags with the given id."""
+		return self.tagIndex.findAll(id)
+
+	def count(self, id):
+		"""Returns the number of open and standalone tags with the given id."""
+		return self.tagIndex.count(id)
+
+	def first(self, id):
+		"""Returns the first open or standalone tag with the given id, or None."""
+		return self.tagIndex.first(id)
+
+	def __repr__(self):
+		return 'Elems(%s)' % str(self.elems)
+
+class LazyElems(Elems):
+	"""An Elems of a LazyDocument, whose elements are parsed the first time they
+are asked for and then kept.  It pickles as a plain Elems."""
+	__slots__ = ('document', 'start', 'stop', '_elems')
+
+	def __init__(self, document, start, stop):
+		self.document = document
+		self.start = start
+		self.stop = stop
+
+	@property
+	def elems(self):
+		try:
+			return self._elems
+		except AttributeError:
+			# Like Elems, an empty one holds a list.
+			self._elems = self.document.parseLevel(self.start, self.stop) or []
+			return self._elems
+
+	def isParsed(self):
+		"""Returns whether the elements have been parsed yet."""
+		return hasattr(self, '_elems')
+
+	def __reduce__(self):
+		return (Elems, (self.elems,))
+
+	def __repr__(self):
+		return 'Elems(%s)' % str(self.elems)
+
+# Maps node classes to their Tape kind codes.
+_tapeCodes = dict((nodeClass, code) for code, nodeClass in enumerate(Tape.kinds))
+
+# Header of an encoded Tape: magic, version, array item size, whether the
+# arrays are little endian, whether the text is unicode, then the numbers of
+# nodes, bytes of ids, bytes of text and line starts.
+_tapeHeader = '<6sHBBBQQQQ'
+_tapeMagic = 'SHTAPE'
+_tapeVersion = 1
+
+class SimpHtmlEventParser(object):
+	"""Implements the same grammar as SimpHtmlParser, but reports what it finds as a
+stream of events rather than building an AST, and matches tags as it goes
+against a stack of the currently open IdTokens.  Memory use is independent
+of the document size, apart from that stack and the current run of text."""
+	def __init__(self, engine = 'dfa'):
+		self.engine = engine
+
+	def events(self, lines):
+		"""Generator that yields the parse events for the given lines of text (or
+TokenBuffer)."""
+		for kind, value in self._events(self._tokens(lines)):
+			if kind == 'text':
+				yield (kind, value)
+			else:
+				yield (kind, value.id)
+
+	def _tokens(self, lines):
+		"""Returns a token iterator for the given lines of text (or TokenBuffer), with
+each run of text already coalesced into a single TextToken."""
+		if isinstance(lines, TokenBuffer):
+			return coalesceText(iter(lines))
+		return tokenize(lines, True, self.engine, coalesce = True)
+
+	def _events(self, tokens):
+		"""Generator that yields the parse events for the given tokens, with the
+IdToken of each tag in place of its id.  Runs of text must already have been
+coalesced, as each TextToken becomes a text event of its own."""
+		# IdTokens of the open tags enclosing the current position.
+		openIds = []
+		for token in tokens:
+			if token.isTextToken():
+				yield ('text', token.text)
+				continue
+
+			if not token.isLtToken():
+				raise ParseError('Expected LtToken or TextToken but got %s.' %
+				                 token.name(),
+				                 token.line, token.col)
+			ltToken = token
+			token = next(tokens, None)
+			if token is None:
+				raise ParseError('Expected token after LtToken but ran out of tokens.', ltToken.line, ltToken.col)
+
+			if token.isSlashToken():
+				idToken = next(tokens, None)
+				gtToken = next(tokens, None)
+				if gtToken is None:
+					raise ParseError('Expected IdToken then GtToken for CloseTag but ran out of tokens.', token.line, token.col)
+				if not (idToken.isIdToken() and gtToken.isGtToken()):
+					raise ParseError('Expected IdToken then GtToken for CloseTag but got %s and %s.' %
+					                 (idToken.name(), gtToken.name()),
+					                 idToken.line, idToken.col)
+				if not openIds:
+					raise MatchError.at("Close tag '%s' with no matching open tag." % idToken.id, idToken)
+				if openIds[-1].id != idToken.id:
+					raise MatchError.at("Close tag '%s' does not match open tag '%s'." % (idToken.id, openIds[-1].id), idToken)
+				openIds.pop()
+				yield ('end', idToken)
+			elif token.isIdToken():
+				idToken = token
+				token = next(tokens, None)
+				if token is None:
+					raise ParseError('Expected token following IdToken but ran out of tokens.', idToken.line, idToken.col)
+				if token.isSlashToken():
+					gtToken = next(tokens, None)
+					if gtToken is None:
+						raise ParseError('Expected GtToken for StandaloneTag but ran out of tokens.', idToken.line, idToken.col)
+					if not gtToken.isGtToken():
+						raise ParseError('Expected GtToken for StandaloneTag but got %s.' %
+						                 gtToken.name(),
+						                 idToken.line, idToken.col)
+					yield ('standalone', idToken)
+				elif token.isGtToken():
+					openIds.append(idToken)
+					yield ('start', idToken)
+				else:
+					raise ParseError('Expected SlashToken or GtToken after IdToken but got %s.' %
+					                 token.name(),
+					                 token.line, token.col)
+			else:
+				raise ParseError('Expected SlashToken or IdToken after LtToken but got %s.' %
+				                 token.name(),
+				                 token.line, token.col)
+
+		if openIds:
+			raise MatchError.at("Missing close tag for open tag '%s'." % openIds[-1].id, openIds[-1])
+
+	def _recoveringEvents(self, tokens, errors):
+		"""Generator like _events that appends each error to errors rather than
+raising it, then recovers from it.  The tokens may include the TokenizeErrors
+of a recovering ScanTokenStream, which has skipped to the next '<' after each
+one.  A tag that isn't well formed is reported as _events would report it,
+then dropped, along with the tokens after it up to the next LtToken or text.
+A close tag that doesn't match the innermost open tag closes the open tags
+inside the one it does match, or is dropped if it matches none of them, and
+open tags still open at the end of the document are closed there.  These
+implied close tags have no position.  Runs of text with nothing but dropped
+tokens between them are joined."""
+		openIds = []
+		# How many of the open tags have each id.
+		openCounts = {}
+		# Tokens read ahead of the current one.
+		ahead = deque()
+		# Text not yet reported, which may be joined by more once what lies between is dropped.
+		texts = []
+		while True:
+			token = ahead.popleft() if ahead else next(tokens, None)
+			if token is None:
+				break
+			if isinstance(token, TokenizeError):
+				errors.append(token)
+				continue
+			if token.isTextToken():
+				texts.append(token.text)
+				continue
+
+			if not token.isLtToken():
+				errors.append(ParseError('Expected LtToken or TextToken but got %s.' % token.name(),
+				                         token.line, token.col))
+				length = 1
+				kind = None
+			else:
+				# A tag is at most four tokens long.
+				tag = [token]
+				while len(tag) < 4:
+					token = ahead.popleft() if ahead else next(tokens, None)
+					if token is None:
+						break
+					tag.append(token)
+					if isinstance(token, TokenizeError):
+						break
+				kind, idToken, length = self._recoverTag(tag, errors)
+				ahead.extendleft(reversed(tag[length:]))
+			if kind is None:
+				# Skip to the next LtToken, text or error.
+				while True:
+					token = ahead.popleft() if ahead else next(tokens, None)
+					if token is None:
+						break
+					if isinstance(token, TokenizeError) or token.isLtToken() or token.isTextToken():
+						ahead.appendleft(token)
+						break
+				continue
+
+			if kind == 'end' and not openCounts.get(idToken.id):
+				if openIds:
+					errors.append(MatchError.at("Close tag '%s' does not match open tag '%s'." %
+					                            (idToken.id, openIds[-1].id), idToken))
+				else:
+					errors.append(MatchError.at("Close tag '%s' with no matching open tag." % idToken.id, idToken))
+				continue
+			if texts:
+				yield ('text', ''.join(texts))
+				texts = []
+			if kind == 'start':
+				openIds.append(idToken)
+				openCounts[idToken.id] = openCounts.get(idToken.id, 0) + 1
+			elif kind == 'end':
+				if openIds[-1].id != idToken.id:
+					errors.append(MatchError.at("Close tag '%s' does not match open tag '%s'." %
+					                            (idToken.id, openIds[-1].id), idToken))
+					while openIds[-1].id != idToken.id:
+						openId = openIds.pop()
+						openCounts[openId.id] -= 1
+						yield ('end', IdToken(openId.id))
+				openIds.pop()
+				openCounts[idToken.id] -= 1
+			yield (kind, idToken)
+
+		if texts:
+			yield ('text', ''.join(texts))
+		while openIds:
+			openId = openIds.pop()
+			errors.append(MatchError.at("Missing close tag for open tag '%s'." % openId.id, openId))
+			yield ('end', IdToken(openId.id))
+
+	def _recoverTag(self, tag, errors):
+		"""Matches the tokens read for a tag (the LtToken then up to three more, or
+fewer at the end of the document or at a TokenizeError) against the tag
+rules, as _events would.  Returns the tag's (kind, IdToken, length in tokens)
+if it is well formed, or else appends the error to errors and returns (None,
+None, 1).  A tag cut short by a TokenizeError isn't reported, as the
+TokenizeError is, next."""
+		cut = isinstance(tag[-1], TokenizeError)
+		ltToken, first, second, third = ((tag[:-1] if cut else tag) + [None] * 3)[:4]
+		# Whether the tag ran out of tokens.
+		short = False
+		if first is None:
+			short = True
+			error = ParseError('Expected token after LtToken but ran out of tokens.', ltToken.line, ltToken.col)
+		elif first.isSlashToken():
+			if third is None:
+				short = True
+				error = ParseError('Expected IdToken then GtToken for CloseTag but ran out of tokens.',
+				                   first.line, first.col)
+			elif not (second.isIdToken() and third.isGtToken()):
+				error = ParseError('Expected IdToken then GtToken for CloseTag but got %s and %s.' %
+				                   (second.name(), third.name()),
+				                   second.line, second.col)
+			else:
+				return ('end', second, 4)
+		elif first.isIdToken():
+			if second is None:
+				short = True
+				error = ParseError('Expected token following IdToken but ran out of tokens.', first.line, first.col)
+			elif second.isSlashToken():
+				if third is None:
+					short = True
+					error = ParseError('Expected GtToken for StandaloneTag but ran out of tokens.', first.line, first.col)
+				elif not third.isGtToken():
+					error = ParseError('Expected GtToken for StandaloneTag but got %s.' % third.name(),
+					                   first.line, first.col)
+				else:
+					return ('standalone', first, 4)
+			elif second.isGtToken():
+				return ('start', first, 3)
+			else:
+				error = ParseError('Expected SlashToken or GtToken after IdToken but got %s.' % second.name(),
+				                   second.line, second.col)
+		else:
+			error = ParseError('Expected SlashToken or IdToken after LtToken but got %s.' % first.name(),
+			                   first.line, first.col)
+		if not (short and cut):
+			errors.append(error)
+		return (None, None, 1)
+
+class SimpHtmlParser(SimpHtmlEventParser):
+	"""Processes a token stream and produces an AST.
 
 The production rules for the syntax are:
 <elems>      ::= <elem> <elems> | epsilon
@@ -93,126 +874,186 @@ The production rules for the syntax are:
 <text>       ::= [TextToken,EscapeLtToken,EscapeAmpToken]+
 <standalone> ::= LtToken IdToken SlashToken GtToken
 <open>       ::= LtToken IdToken GtToken
-<close>      ::= LtToken SlashToken IdToken GtToken"""
-	def __init__(self):
-		self.tokens = None
+<close>      ::= LtToken SlashToken IdToken GtToken
+
+An <open> tag is followed by its nested elements, wrapped in an Elems if there
+are any, and then by its <close> tag.  The rules are applied by the event
+parser this builds on, which also matches open and close tags as it goes.
+Each run of <text> reaches it as a single TextToken, so a parse error at text
+names a TextToken, at the position of the run's last character, whatever
+escapes the run holds.  The tree is built with an explicit stack rather than by recursion, so there
+is no limit on how deeply tags can be nested.
+
+If shared is True, the parser shares one instance between all the CloseTags
+with the same id, and likewise for StandaloneTags (see parse).  If hashcons
+is True, it shares one instance between all equal subtrees, finding them by
+their structural hash as the tree is built bottom up.  If indexed is True, it
+builds a TagIndex as it goes and returns an IndexedElems."""
+	def __init__(self, engine = 'dfa', shared = False, hashcons = False, indexed = False):
+		SimpHtmlEventParser.__init__(self, engine)
+		self.shared = shared
+		self.hashcons = hashcons
+		self.indexed = indexed
 
 	def parse(self, lines):
 		"""Parse the given lines of text into a AST that represents the simple HTML
-document in the text.  Raises a ParseError for parsing problems and a
-TokenizeError for tokenization problems."""
-		self.tokens = tokenize(lines, True)
-		return Elems(self._elems())
+document in the text.  Raises a ParseError for parsing problems, a
+TokenizeError for tokenization problems and a MatchError for mismatched tags.
+The lines may also be a TokenBuffer that has already been tokenized."""
+		return self._build(self._events(self._tokens(lines)))
+
+	def recover(self, lines):
+		"""Parses the given lines of text like parse, but recovers from errors
+rather than raising them (see _recoveringEvents), in one pass over the
+document.  Returns the best effort tree, and a list of every error found."""
+		errors = []
+		if isinstance(lines, TokenBuffer):
+			tokens = coalesceText(iter(lines))
+		else:
+			chunks = _chunks(lines)
+			stream = ScanTokenStream(lines) if chunks is None else ScanTokenStream.fromChunks(chunks)
+			stream.recovering = True
+			tokens = stream.textRuns()
+		return (self._build(self._recoveringEvents(tokens, errors)), errors)
 
-	def _elems(self):
-		"""Produces a recursive sequence of elements."""
+	def _build(self, events):
+		"""Builds the AST from the given parse events, as yielded by _events."""
+		builder = self._builder()
+		next(builder)
+		send = builder.send
+		for event in events:
+			send(event)
+		return send(None)
+
+	def _builder(self):
+		"""Generator that builds the AST from the parse events sent to it one at a
+time, as yielded by _events, and yields the AST once it is sent None."""
+		# Elements of the innermost open tag, and of each enclosing one.
 		elems = []
+		enclosing = []
+		if self.shared:
+			# The one copy of each tag id, and the shared tags by id.
+			ids = {}
+			closeTags = {}
+			standaloneTags = {}
+		# The one instance of each distinct subtree, when hash consing.
+		nodes = {} if self.hashcons else None
+		if self.indexed:
+			tagIndex = TagIndex()
+			# The open tags enclosing the current position.
+			openTags = []
 		while True:
-			elem = self._elem()
-			if len(elem) > 0:
-				# Merge Text elements
-				if len(elems) > 0 and \
-				   elems[-1].isText() and \
-				   len(elem) == 1 and \
-				   elem[0].isText():
-					elems[-1] = Text(elems[-1].text + elem[0].text)
-				else:
-					elems += elem
-				# Close tag, bump up one level of nesting
-				if elem[0].isCloseTag():
-					break
-			else:
+			event = yield
+			if event is None:
 				break
-		return tuple(elems)
-
-	def _elem(self):
-		"""Produces one or more elements."""
-		try:
-			token = self.tokens.next()
-		except StopIteration:
-			return []
-
-		if token.isLtToken():
-			return self._lt(token)
-		elif token.isTextToken():
-			return self._text(token)
-		else:
-			raise ParseError('Expected LtToken or TextToken but got %s.' %
-			                 token.name(),
-			                 token.line, token.col)
-
-	def _lt(self, ltToken):
-		"""LtToken state handler."""
-		try:
-			token = self.tokens.next()
-		except StopIteration:
-			raise ParseError('Expected token after LtToken but ran out of tokens.', ltToken.line, ltToken.col)
-
-		# CloseTag?
-		if token.isSlashToken():
-			return self._closeTag(token)
-		elif token.isIdToken():
-			return self._id(token)
-		else:
-			raise ParseError('Expected SlashToken or IdToken after LtToken but got %s.' %
-			                 token.name(),
-			                 token.line, token.col)
+			kind, value = event
+			if kind == 'text':
+				node = Text(value)
+			elif self.hashcons:
+				node = self._tagClasses[kind](value.id)
+			elif not self.shared:
+				node = self._tagClasses[kind](value.id, value.offset, value.index)
+			else:
+				id = ids.setdefault(value.id, value.id)
+				if kind == 'start':
+					node = OpenTag(id, value.offset, value.index)
+				elif kind == 'end':
+					node = closeTags.get(id) or closeTags.setdefault(id, CloseTag(id))
+				else:
+					node = standaloneTags.get(id) or standaloneTags.setdefault(id, StandaloneTag(id))
+			if nodes is not None:
+				node = nodes.setdefault(node, node)
+			if self.indexed and kind != 'text':
+				if kind == 'end':
+					openTags.pop()
+				else:
+					tagIndex.add(node, openTags[-1] if openTags else None, len(openTags))
+					if kind == 'start':
+						openTags.append(node)
 
-	def _id(self, idToken):
-		"""IdToken state handler."""
-		try:
-			token = self.tokens.next()
-		except StopIteration:
-			raise ParseError('Expected token following IdToken but ran out of tokens.', idToken.line, idToken.col)
-
-		if token.isSlashToken():
-			return self._standaloneTag(idToken)
-		elif token.isGtToken():
-			return self._openTag(idToken)
+			if kind == 'end':
+				nested = elems
+				elems = enclosing.pop()
+				if nested:
+					nested = Elems(tuple(nested))
+					if nodes is not None:
+						nested = nodes.setdefault(nested, nested)
+					elems.append(nested)
+			elems.append(node)
+			if kind == 'start':
+				enclosing.append(elems)
+				elems = []
+		if self.indexed:
+			yield IndexedElems(tuple(elems), tagIndex)
 		else:
-			raise ParseError('Expected SlashToken or GtToken after IdToken but got %s.' %
-			                 token.name(),
-			                 token.line, token.col)
-
-	def _openTag(self, idToken):
-		"""Produces an open tag, nests the following elements, then flattens the ending tag."""
-		elems = self._elems()
-		if len(elems) > 1:
-			return [OpenTag(idToken.id), Elems(elems[:-1]), elems[-1]]
-		elif len(elems) == 1:
-			return [OpenTag(idToken.id), elems[0]]
-		else:
-			return [OpenTag(idToken.id)]
+			yield Elems(tuple(elems))
 
-	def _standaloneTag(self, idToken):
-		"""Produces a single StandaloneTag if the next token is a GtToken."""
-		try:
-			gtToken = self.tokens.next()
-		except StopIteration:
-			raise ParseError('Expected GtToken for StandaloneTag but ran out of tokens.', idToken.line, idToken.col)
+	def parseTape(self, lines):
+		"""Parse the given lines of text, like parse, into a Tape rather than a tree."""
+		tape = Tape()
+		appendKind = tape.kindCodes.append
+		appendSymbol = tape.symbols.append
+		appendStart = tape.starts.append
+		appendLength = tape.lengths.append
+		appendOffset = tape.offsets.append
+		appendEnd = tape.ends.append
+		ends = tape.ends
+		symbols = {}
+		texts = []
+		textSize = 0
+		# Index of the Elems node of the innermost open tag, and of each enclosing one.
+		elemsNode = 0
+		enclosing = []
+		appendKind(_tapeCodes[Elems])
+		appendSymbol(-1)
+		appendStart(0)
+		appendLength(0)
+		appendOffset(-1)
+		appendEnd(0)
+		for kind, value in self._events(self._tokens(lines)):
+			if kind == 'text':
+				appendKind(_tapeCodes[Text])
+				appendSymbol(-1)
+				appendStart(textSize)
+				appendLength(len(value))
+				appendOffset(-1)
+				appendEnd(len(ends) + 1)
+				texts.append(value)
+				textSize += len(value)
+				continue
+			if tape.index is None:
+				tape.index = value.index
+			symbol = symbols.get(value.id)
+			if symbol is None:
+				symbol = symbols[value.id] = len(tape.ids)
+				tape.ids.append(value.id)
 
-		if gtToken.isGtToken():
-			return [StandaloneTag(idToken.id)]
-		else:
-			raise ParseError('Expected GtToken for StandaloneTag but got %s.' %
-			                 gtToken.name(),
-			                 idToken.line, idToken.co)
+			if kind == 'end':
+				if len(ends) == elemsNode + 1:
+					# The tag has no elements, so drop its Elems node again.
+					for nodes in (tape.kindCodes, tape.symbols, tape.starts, tape.lengths, tape.offsets, ends):
+						nodes.pop()
+				else:
+					ends[elemsNode] = len(ends)
+				elemsNode = enclosing.pop()
+			appendKind(_tapeCodes[self._tagClasses[kind]])
+			appendSymbol(symbol)
+			appendStart(0)
+			appendLength(0)
+			appendOffset(-1 if value.offset is None else value.offset)
+			appendEnd(len(ends) + 1)
+			if kind == 'start':
+				enclosing.append(elemsNode)
+				elemsNode = len(ends)
+				appendKind(_tapeCodes[Elems])
+				appendSymbol(-1)
+				appendStart(0)
+				appendLength(0)
+				appendOffset(-1)
+				appendEnd(0)
+		ends[0] = len(ends)
+		tape.textStore = ''.join(texts)
+		return tape
 
-	def _closeTag(self, slashToken):
-		"""Produces a single close tag if the next two tokens are and IdToken and a GtToken."""
-		try:
-			idToken = self.tokens.next()
-			gtToken = self.tokens.next()
-			if idToken.isIdToken() and gtToken.isGtToken():
-				return [CloseTag(idToken.id)]
-			else:
-				raise ParseError('Expected IdToken then GtToken for CloseTag but got %s and %s.' %
-				                 idToken.name(),
-				                 gtToken.name(),
-				                 idToken.line, idToken.col)
-		except StopIteration:
-			raise ParseError('Expected IdToken then GtToken for CloseTag but ran out of tokens.', slashToken.line, slashToken.col)
-
-	def _text(self, textToken):
-		"""Produces a single Text element."""
-		return [Text(textToken.text)]
+	# Tag class for each kind of tag event.
+	_tagClasses = {'start': OpenTag, 'end': CloseTag, 'standalone': StandaloneTag}
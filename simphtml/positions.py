@@ -0,0 +1,78 @@
+import re
+from array import array
+from bisect import bisect_right
+
+_newline = re.compile('\n')
+
+class LineIndex(object):
+	"""Newline index for one document, used to turn the character offsets that
+tokens, tags and errors carry into (line, col) positions.  Lines and columns
+are zero based, and a newline belongs to the line it ends.
+
+The index is either recorded chunk by chunk while a document streams past
+(see extend), or, when the whole document is held in one buffer, built from
+that buffer the first time a position is asked for."""
+	def __init__(self, source = None):
+		self._source = source
+		# Offset of the first character of every line, once known.
+		self._starts = array('l', [0]) if source is None else None
+
+	@classmethod
+	def fromStarts(cls, starts):
+		"""Returns an index over the lines starting at the given offsets."""
+		index = cls()
+		index._starts = starts
+		return index
+
+	def lineStarts(self):
+		"""Returns an array of the offset of the first character of every line."""
+		self._build()
+		return self._starts
+
+	def extend(self, chunk, base):
+		"""Records the newlines in chunk, which starts at offset base of the document."""
+		append = self._starts.append
+		for match in _newline.finditer(chunk):
+			append(base + match.end())
+
+	def position(self, offset):
+		"""Returns the (line, col) of the given offset."""
+		self._build()
+		line = max(bisect_right(self._starts, offset) - 1, 0)
+		return (line, offset - self._starts[line])
+
+	def _build(self):
+		"""Builds the index from the source if it hasn't been yet."""
+		if self._starts is None:
+			self._starts = array('l', [0])
+			self.extend(self._source, 0)
+			# The source isn't needed any more, so don't keep it alive.
+			self._source = None
+
+	def __getstate__(self):
+		# Only the index is pickled, not the source (which may be an mmap).
+		self._build()
+		return {'_source': None, '_starts': self._starts}
+
+class Located(object):
+	"""Mixin for objects that remember the offset they were found at in a
+document, along with the LineIndex that can resolve it.  The line and col
+are only worked out when asked for, and are None if the offset is unknown."""
+	# Lets slotted subclasses do without a __dict__.
+	__slots__ = ()
+	offset = None
+	index = None
+
+	def position(self):
+		"""Returns the (line, col) this object was found at."""
+		if self.offset is None or self.index is None:
+			return (None, None)
+		return self.index.position(self.offset)
+
+	@property
+	def line(self):
+		return self.position()[0]
+
+	@property
+	def col(self):
+		return self.position()[1]
@@ -0,0 +1,145 @@
+from collections import deque
+from tokens import ScanTokenStream, TextToken, TokenizeError
+from parser import SimpHtmlParser
+
+class PushParser(object):
+	"""Parses a document pushed into it a chunk at a time, as it arrives from a
+socket or other non-blocking source, rather than pulling it from an iterable
+of lines.  Each call to feed() does work bounded by the size of its chunk and
+returns the parse events (as iterparse() reports them) completed so far, so an
+event loop can interleave one large document with other work by feeding it
+bounded reads:
+
+	parser = PushParser()
+	for chunk in chunks:
+		handle(parser.feed(chunk))
+	handle(parser.close())
+	tree = parser.root
+
+The same TokenizeError, ParseError and MatchError conditions as parse() are
+raised, from the call that reaches them.  If build is True, the AST is built
+as the events are completed, and close() leaves it, equal to what parse()
+returns, in root; otherwise nothing is kept but the currently open tags and
+the text of the current run, for validating documents of any size."""
+	def __init__(self, build = True):
+		self.build = build
+		self.root = None
+		self._stream = ScanTokenStream()
+		# Text of the run of text being read, and the last piece of it.
+		self._run = []
+		self._last = None
+		# Tokens of the tag being read, which may not be all the event parser reads for it yet.
+		self._tag = []
+		# Tokens passed on to the event parser but not yet read by it.
+		self._queue = deque()
+		self._closed = False
+		self._parser = SimpHtmlParser()
+		self._events = self._parser._events(self._queued())
+		if build:
+			self._builder = self._parser._builder()
+			next(self._builder)
+
+	def feed(self, chunk):
+		"""Parses the next chunk of the document and returns a list of the events
+it completed."""
+		events = []
+		try:
+			for token in self._stream._feedTokens(chunk):
+				self._push(token, events)
+		except TokenizeError:
+			# A run of text cut short by the bad character is parsed first, as parse()
+			# would, in case the tag it is in raises an error of its own.
+			self._endRun(events)
+			raise
+		return events
+
+	def close(self):
+		"""Ends the document and returns a list of any events still pending.  The
+AST is then in root, if it is being built."""
+		events = []
+		try:
+			for token in self._stream._closeTokens():
+				self._push(token, events)
+		except TokenizeError:
+			self._endRun(events)
+			raise
+		self._endRun(events)
+		self._closed = True
+		# Pass on what there is of a tag cut short, and finish the event parser,
+		# which raises the error for it and checks that every tag was closed.
+		self._queue.extend(self._tag)
+		del self._tag[:]
+		for event in self._events:
+			self._event(event, events)
+		if self.build:
+			self.root = self._builder.send(None)
+			self._builder = None
+		return events
+
+	def _push(self, token, events):
+		"""Takes the next token, and appends to events any event it completes."""
+		if token.isTextToken():
+			self._run.append(token.text)
+			self._last = token
+			return
+		if self._run:
+			self._endRun(events)
+		self._pushTag(token, events)
+
+	def _endRun(self, events):
+		"""Ends the run of text being read, if any, passing it on as one TextToken as
+textRuns would."""
+		if not self._run:
+			return
+		last = self._last
+		if len(self._run) == 1 and isinstance(last, TextToken):
+			token = last
+		else:
+			token = TextToken(''.join(self._run), last.offset, last.index)
+		self._run = []
+		self._last = None
+		self._pushTag(token, events)
+
+	def _pushTag(self, token, events):
+		"""Adds a token to the tag being read, or a run of text or a token out of
+place if there is none, and passes the tag on to the event parser once it has
+all the tokens the event parser reads for it."""
+		tag = self._tag
+		tag.append(token)
+		if not _isWhole(tag):
+			return
+		self._queue.extend(tag)
+		del tag[:]
+		# Each group of tokens is read as exactly one event, or raises an error.
+		self._event(next(self._events), events)
+
+	def _event(self, event, events):
+		"""Adds an event from the event parser to the AST being built, and appends it
+to events as iterparse() would report it."""
+		if self.build:
+			self._builder.send(event)
+		kind, value = event
+		events.append(event if kind == 'text' else (kind, value.id))
+
+	def _queued(self):
+		"""Generator that gives the event parser the tokens passed on to it."""
+		queue = self._queue
+		while queue or not self._closed:
+			yield queue.popleft()
+
+def _isWhole(tokens):
+	"""Returns whether tokens, a run of text or token out of place, or the tokens
+of a tag so far, are all the tokens the event parser reads as one event (for a
+tag, as many of them as it reads before finding one out of place)."""
+	if not tokens[0].isLtToken():
+		return True
+	# The event parser reads the token after an LtToken, then both tokens after a
+	# SlashToken, or the one after an IdToken and the one after that SlashToken.
+	if len(tokens) < 2:
+		return False
+	second = tokens[1]
+	if second.isSlashToken():
+		return len(tokens) == 4
+	if second.isIdToken():
+		return len(tokens) == 4 or (len(tokens) == 3 and not tokens[2].isSlashToken())
+	return True
@@ -0,0 +1,65 @@
+import re
+from parser import OpenTag, CloseTag, StandaloneTag
+
+# Number of pieces of output gathered into each write.
+_writePieces = 4096
+
+# A '/' that would be read back as a SlashToken: at the start of a text, or after an escape.
+_slashAfterEscape = re.compile(r'^/|[&<]/').search
+
+# Markup for each class of tag.
+_tagFormats = {OpenTag: '<%s>', CloseTag: '</%s>', StandaloneTag: '<%s/>'}
+
+def serialize(tree, out = None):
+	"""Writes the simple HTML for the given AST to the file-like object out, or
+returns it as a string if out is None, so that parse(serialize(tree)) == tree.
+
+'&' and '<' in text are written as the escapes '&amp' and '&lt'.  There is no
+escape for '>', so text holding one raises a ValueError.  Nor is there one for
+'/', which reads back as a SlashToken at the start of a text or after an
+escape, so text starting with '/' or with '/' after '&' or '<' raises a
+ValueError too.  The tree is walked with an explicit stack rather than
+recursively, and the output is gathered into large writes rather than
+written node by node."""
+	if out is None:
+		writes = []
+		_serialize(tree, writes.append)
+		return ''.join(writes)
+	_serialize(tree, out.write)
+
+def _serialize(tree, write):
+	"""Passes the simple HTML for the given AST to write, a large piece at a time."""
+	pieces = []
+	append = pieces.append
+	tagFormats = _tagFormats
+	# Iterators over the elements of the current Elems and each enclosing one.
+	levels = [iter(tree.elems)]
+	while levels:
+		for elem in levels[-1]:
+			format = tagFormats.get(elem.__class__)
+			if format is not None:
+				append(format % elem.id)
+			elif elem.isText():
+				text = elem.text
+				if '>' in text:
+					raise ValueError("Text %r can't be written as simple HTML, as it holds a '>'." % text)
+				if '/' in text and _slashAfterEscape(text):
+					raise ValueError("Text %r can't be written as simple HTML, as it has a '/' at its start "
+					                 "or after an escape." % text)
+				append(text.replace('&', '&amp').replace('<', '&lt'))
+			elif elem.isElems():
+				levels.append(iter(elem.elems))
+				break
+			elif elem.isOpenTag():
+				append('<%s>' % elem.id)
+			elif elem.isCloseTag():
+				append('</%s>' % elem.id)
+			else:
+				append('<%s/>' % elem.id)
+			if len(pieces) >= _writePieces:
+				write(''.join(pieces))
+				del pieces[:]
+		else:
+			levels.pop()
+	if pieces:
+		write(''.join(pieces))
@@ -0,0 +1,47 @@
+from array import array
+
+class TagIndex(object):
+	"""Index from tag id to the open and standalone tags with that id in a
+document, in document order, along with the open tag each one is nested in
+(None at the top level) and its depth (0 at the top level).
+
+It is filled in by the parser as the tags are found, and answers queries in
+time proportional to the number of matching tags rather than the size of the
+document."""
+	def __init__(self):
+		# (tags, parents, depths) for each id.
+		self._entries = {}
+
+	def add(self, tag, parent, depth):
+		"""Adds a tag, nested in the open tag parent, at the given depth."""
+		entries = self._entries.get(tag.id)
+		if entries is None:
+			entries = self._entries[tag.id] = ([], [], array('l'))
+		entries[0].append(tag)
+		entries[1].append(parent)
+		entries[2].append(depth)
+
+	def ids(self):
+		"""Returns the ids of the tags in the document."""
+		return self._entries.keys()
+
+	def findAll(self, id):
+		"""Returns a tuple of the open and standalone tags with the given id."""
+		entries = self._entries.get(id)
+		return tuple(entries[0]) if entries else ()
+
+	def count(self, id):
+		"""Returns the number of open and standalone tags with the given id."""
+		entries = self._entries.get(id)
+		return len(entries[0]) if entries else 0
+
+	def first(self, id):
+		"""Returns the first open or standalone tag with the given id, or None."""
+		entries = self._entries.get(id)
+		return entries[0][0] if entries else None
+
+	def where(self, id):
+		"""Returns a list of (tag, parent, depth) for each open and standalone tag
+with the given id, where parent is the open tag it is nested in."""
+		entries = self._entries.get(id)
+		return zip(*entries) if entries else []
@@ -1,5 +1,6 @@
 import unittest
-from simphtml import parse
+import pickle
+from simphtml import parse, match, isValid, MatchError
 from simphtml.parser import *
 
 class TestAst(unittest.TestCase):
@@ -30,3 +31,93 @@ class TestAst(unittest.TestCase):
 		self.assertEqual(parse('<f>Text</f>'), Elems((OpenTag('f'), Elems((Text('Text'),)), CloseTag('f'))))
 		self.assertEqual(parse('<f> Text <g/> Text <h>Text</h></f>'), Elems((OpenTag('f'), Elems((Text(' Text '), StandaloneTag('g'), Text(' Text '), OpenTag('h'), Elems((Text('Text'),)), CloseTag('h'))), CloseTag('f'))))
 		self.assertEqual(parse('<f><g><h><i></i></h></g></f>'), Elems((OpenTag('f'), Elems((OpenTag('g'), Elems((OpenTag('h'), Elems((OpenTag('i'), CloseTag('i'))), CloseTag('h'))), CloseTag('g'))), CloseTag('f'))))
+
+class TestMatchErrorPosition(unittest.TestCase):
+	def assertMatchError(self, text, line, col):
+		try:
+			parse(text)
+			self.fail('No MatchError for %r' % text)
+		except MatchError as e:
+			self.assertEqual((e.line, e.col), (line, col))
+
+	def test_positions(self):
+		self.assertMatchError('<f></g>', 0, 6)
+		self.assertMatchError('</x>', 0, 3)
+		self.assertMatchError('<a>\n<f>\n</a>', 2, 3)
+		self.assertMatchError('<a>\n<f>\n', 1, 2)
+		self.assertMatchError('text\n\n  <b>', 2, 4)
+
+	def test_hand_built(self):
+		try:
+			match(Elems((OpenTag('f'),)))
+			self.fail('No MatchError')
+		except MatchError as e:
+			self.assertEqual((e.line, e.col), (None, None))
+
+	def test_position_ignored_by_equality(self):
+		self.assertEqual(parse('<f/>\n'), Elems((StandaloneTag('f'), Text('\n'))))
+
+	def test_fails_before_end(self):
+		# The mismatch is found before the parse error at the end of the input.
+		self.assertMatchError('<a></b><', 0, 6)
+
+class TestDeepNesting(unittest.TestCase):
+	depth = 10000
+
+	def deepTree(self, depth):
+		"""Builds the AST expected for depth nested <a> tags around some text."""
+		tree = Elems((Text('x'),))
+		for i in range(depth - 1):
+			tree = Elems((OpenTag('a'), tree, CloseTag('a')))
+		return Elems((OpenTag('a'), tree, CloseTag('a')))
+
+	def test_deep(self):
+		text = '<a>' * self.depth + 'x' + '</a>' * self.depth
+		tree = parse(text, 'scan')
+		self.assertEqual(tree, self.deepTree(self.depth))
+		self.assertEqual(match(tree), tree)
+		self.assertTrue(isValid(text))
+
+	def test_deep_errors(self):
+		self.assertRaises(MatchError, parse, '<a>' * self.depth + '</a>' * (self.depth - 1), 'scan')
+		self.assertRaises(MatchError, match, Elems((OpenTag('a'), self.deepTree(self.depth))))
+
+	def test_wide(self):
+		text = '<a/>x' * self.depth
+		self.assertEqual(parse(text, 'scan'), Elems((StandaloneTag('a'), Text('x')) * self.depth))
+
+class TestNodes(unittest.TestCase):
+	document = '<f>a&ltb<g/>\n<h></h><g/></f>c'
+
+	def test_slots(self):
+		for node in parse(self.document).elems[1].elems + (Elems(), Text('x')):
+			self.assertFalse(hasattr(node, '__dict__'))
+
+	def test_fields(self):
+		tag = parse(self.document).elems[0]
+		self.assertEqual((tag.id, tag.line, tag.col), ('f', 0, 2))
+		self.assertEqual((OpenTag('f').offset, OpenTag('f').line), (None, None))
+		self.assertNotEqual(Text('a'), Text('b'))
+		self.assertNotEqual(OpenTag('a'), CloseTag('a'))
+		self.assertEqual(repr(parse('<f>a&ltb<g/></f>')),
+		                 "Elems((OpenTag('f'), Elems((Text('a<b'), StandaloneTag('g'))), CloseTag('f')))")
+
+	def test_pickle(self):
+		tree = parse(self.document)
+		for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+			self.assertEqual(pickle.loads(pickle.dumps(tree, protocol)), tree)
+
+	def test_shared(self):
+		tree = parse(self.document, shared = True)
+		self.assertEqual(tree, parse(self.document))
+		elems = tree.elems[1].elems
+		self.assertTrue(elems[1] is elems[5])
+		self.assertTrue(elems[0] is not elems[5])
+		self.assertEqual(elems[5].offset, None)
+		self.assertTrue(elems[3].id is elems[4].id)
+
+	def test_memory(self):
+		from simphtml.bench.memory import nodeBytes, dictNodeSize
+		tree = parse(self.document * 50)
+		self.assertTrue(nodeBytes(tree)[0] < nodeBytes(tree, dictNodeSize)[0] / 2)
+		self.assertTrue(nodeBytes(parse(self.document * 50, shared = True))[0] < nodeBytes(tree)[0])
@@ -0,0 +1,83 @@
+import time
+from unittest import TestCase
+from simphtml import parse, isValid, parseMany, MatchError, ParseError, TokenizeError
+from simphtml.parser import *
+from simphtml.test.LazyTests import errorOf
+
+class TestParseMany(TestCase):
+	documents = ['<f>a&ltb<g/>\n<h></h><g/></f>c', '<a>\n</b>', '<a>\n<', 'x\n&x', '<a>', '', 'text']
+	files = ['./simphtml/test/test%d.html' % n for n in range(1, 8)]
+
+	def expected(self, document):
+		try:
+			return parse(document)
+		except (MatchError, ParseError, TokenizeError) as e:
+			return e
+
+	def assertResults(self, results, documents):
+		self.assertEqual([input for input, result in results], documents)
+		for input, result in results:
+			expected = self.expected(input)
+			self.assertEqual(type(result), type(expected))
+			if isinstance(expected, Exception):
+				self.assertEqual((result.line, result.col), (expected.line, expected.col))
+			else:
+				self.assertEqual(result, expected)
+
+	def test_ordered(self):
+		for workers in (1, 2):
+			for chunksize in (1, 3):
+				self.assertResults(list(parseMany(self.documents, workers, chunksize)), self.documents)
+
+	def test_unordered(self):
+		results = sorted(parseMany(self.documents * 3, 2, 2, ordered = False))
+		self.assertResults(results, sorted(self.documents * 3))
+
+	def test_lazy(self):
+		# The inputs are read no further ahead of the results than the workers need.
+		read = []
+		def inputs():
+			for n in range(1000):
+				read.append(n)
+				yield 'text'
+		results = parseMany(inputs(), 2, 2)
+		self.assertEqual(results.next(), ('text', parse('text')))
+		time.sleep(0.5)
+		self.assertTrue(len(read) <= 2 * 2 * 2 + 2)
+		results.close()
+		self.assertEqual(len(list(parseMany(inputs(), 2, 2))), 1000)
+
+	def test_errors(self):
+		results = dict(parseMany(self.documents, 2))
+		self.assertEqual(results['<a>\n</b>'].reason, "Close tag 'b' does not match open tag 'a'.")
+		for document in ('<a>\n</b>', 'x\n&x'):
+			error = results[document]
+			self.assertEqual((type(error), error.line, error.col), errorOf(parse, document))
+
+	def test_positions(self):
+		tree = dict(parseMany(self.documents, 2))[self.documents[0]]
+		tag = tree.elems[1].elems[3]
+		self.assertEqual((tag.id, tag.line, tag.col), ('h', 1, 2))
+
+	def test_tape(self):
+		for input, result in parseMany(self.documents[:1] + self.documents[-2:], 2, layout = 'tape'):
+			self.assertTrue(isinstance(result, ElemsView))
+			self.assertEqual(result, parse(input))
+		self.assertRaises(ValueError, parseMany(self.documents, layout = 'lazy').next)
+
+	def test_validate_only(self):
+		for input, result in parseMany(self.documents, 2, validateOnly = True):
+			if isValid(input):
+				self.assertTrue(result is True)
+			else:
+				self.assertEqual(repr(result), repr(self.expected(input)))
+
+	def test_paths(self):
+		results = list(parseMany(self.files + ['./simphtml/test/missing.html'], 2, paths = True))
+		self.assertEqual([input for input, result in results[:-1]], self.files)
+		for input, result in results[:-1]:
+			with open(input) as file:
+				self.assertEqual(repr(result), repr(self.expected(file.read())))
+		self.assertTrue(isinstance(results[-1][1], IOError))
+		valid = [result is True for input, result in parseMany(self.files, 2, paths = True, validateOnly = True)]
+		self.assertEqual(valid, [isValid(open(name).read()) for name in self.files])
@@ -0,0 +1,67 @@
+from unittest import TestCase
+from simphtml import parse, isValid
+from simphtml.bench.generator import generateDocument
+from simphtml.bench.suite import compare, legacyParser
+
+def depthOf(tree):
+	"""Returns how many tags deep the given tree is nested."""
+	depth = 0
+	stack = [(tree, 0)]
+	while stack:
+		node, level = stack.pop()
+		depth = max(depth, level)
+		if node.isElems():
+			stack.extend((elem, level + 1 if elem.isElems() else level) for elem in node.elems)
+	return depth
+
+class TestGenerator(TestCase):
+	def test_seeded(self):
+		self.assertEqual(generateDocument(4096), generateDocument(4096))
+		self.assertNotEqual(generateDocument(4096), generateDocument(4096, seed = 1))
+		self.assertNotEqual(generateDocument(4096), generateDocument(4096, semicolons = True))
+
+	def test_shapes(self):
+		for options in ({}, {'depth': 1}, {'depth': 40, 'fanout': 2}, {'fanout': 50}, {'textRatio': 0},
+		                {'textRatio': 0.9}, {'escapeDensity': 0.3}, {'idLength': 1}, {'idLength': 40}):
+			document = generateDocument(8192, **options)
+			self.assertTrue(isValid(document), options)
+			self.assertTrue(8192 <= len(document) < 8192 * 1.1, options)
+			self.assertEqual(depthOf(parse(document)), options.get('depth', 8))
+
+	def test_ratios(self):
+		self.assertEqual(generateDocument(8192, textRatio = 0).count('&'), 0)
+		for ratio in (0.1, 0.5, 0.9):
+			document = generateDocument(1 << 16, textRatio = ratio)
+			markup = sum(len(tag) + 2 for tag in document.replace('>', '<').split('<')[1::2])
+			self.assertAlmostEqual(1 - markup / float(len(document)), ratio, delta = 0.05)
+		escapes = generateDocument(1 << 16, escapeDensity = 0.1).count('&')
+		self.assertAlmostEqual(escapes / float(1 << 15), 0.1, delta = 0.03)
+		tags = generateDocument(8192, idLength = 12).replace('/', '').replace('>', '<').split('<')[1::2]
+		self.assertEqual(set(len(tag) for tag in tags), set([12]))
+		self.assertRaises(ValueError, generateDocument, 8192, textRatio = 1)
+
+	def test_legacy(self):
+		legacy = legacyParser()
+		if legacy is not None:
+			document = generateDocument(8192, escapeDensity = 0.2, semicolons = True)
+			self.assertTrue(legacy.parse(legacy.FileData(document)))
+
+class TestCompare(TestCase):
+	baseline = {'shapes': {'default': {'parse MB/s': 10.0, 'parse peak MB': 10.0, 'isValid docs/s': 100.0}}}
+
+	def test_compare(self):
+		results = {'shapes': {'default': {'parse MB/s': 9.5, 'parse peak MB': 10.5, 'isValid docs/s': 200.0},
+		                      'new': {'parse MB/s': 1.0}}}
+		self.assertEqual(compare(results, self.baseline), [])
+		results['shapes']['default'].update({'parse MB/s': 8.0, 'parse peak MB': 12.0})
+		self.assertEqual(compare(results, self.baseline), [
+			('default', 'parse MB/s', 10.0, 8.0, -0.2),
+			('default', 'parse peak MB', 10.0, 12.0, 0.2),
+		])
+		self.assertEqual(compare(results, self.baseline, 0.25), [])
+
+	def test_legacy(self):
+		# The legacy parser's results are for reference, and never regress.
+		baseline = {'shapes': {'default': {'legacy parse MB/s': 10.0, 'legacy parse peak MB': 10.0}}}
+		results = {'shapes': {'default': {'legacy parse MB/s': 5.0, 'legacy parse peak MB': 20.0}}}
+		self.assertEqual(compare(results, baseline), [])
@@ -0,0 +1,48 @@
+import glob
+from unittest import TestCase
+from simphtml import parse, isValid, tokenize, mapFile
+from simphtml import tokens
+from simphtml.test.EngineTests import tokenTrace
+
+class TestBufferInput(TestCase):
+	def sources(self, path):
+		"""Returns the document at path in every supported buffer form."""
+		with open(path) as f:
+			text = f.read()
+		return (text, bytearray(text), memoryview(text), buffer(text), mapFile(path), open(path))
+
+	def test_tokens(self):
+		for path in glob.glob('./simphtml/test/*.html'):
+			with open(path) as f:
+				expected = tokenTrace(f.read(), 'dfa')
+			for engine in ('dfa', 'table', 'scan'):
+				for source in self.sources(path):
+					self.assertEqual(tokenTrace(source, engine), expected)
+
+	def test_parse(self):
+		for path in glob.glob('./simphtml/test/*.html'):
+			with open(path) as f:
+				valid = isValid(f.read())
+			for source in self.sources(path):
+				self.assertEqual(isValid(source, 'scan'), valid)
+		expected = parse(open('./simphtml/test/test2.html').read())
+		self.assertEqual(parse(mapFile('./simphtml/test/test2.html'), 'scan'), expected)
+		self.assertEqual(parse(bytearray(open('./simphtml/test/test2.html').read())), expected)
+
+	def test_memory_chunks(self):
+		chunkSize = tokens._memoryChunkSize
+		tokens._memoryChunkSize = 3
+		try:
+			for text in ('<foo>a&amp;b\nc</foo>\n', '&a\nmp', 'x\n\n<f\n>'):
+				for engine in ('dfa', 'scan'):
+					self.assertEqual(tokenTrace(memoryview(text), engine), tokenTrace(text, 'dfa'))
+		finally:
+			tokens._memoryChunkSize = chunkSize
+
+	def test_compact(self):
+		text = open('./simphtml/test/test2.html').read()
+		self.assertEqual(tokenize(mapFile('./simphtml/test/test2.html'), compact = True).tokens(), tokenize(text))
+		self.assertEqual(tokenize(bytearray(text), compact = True).tokens(), tokenize(text))
+
+	def test_empty_file(self):
+		self.assertEqual(tokenize(mapFile('/dev/null')), ())
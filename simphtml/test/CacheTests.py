@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from simphtml import parse, mapFile, DiskCache, MatchError
+from simphtml.parser import *
+
+class TestTapeEncoding(TestCase):
+	def test_round_trip(self):
+		for document in ('', 'a', '<f>a&ltb<g/>\n<h></h><g/></f>c', u'<a>caf\xe9</a>\n<b/>'):
+			tape = Tape.loads(parse(document, 'scan', layout = 'tape').tape.dumps())
+			self.assertEqual(tape.tree(), parse(document, 'scan'))
+			self.assertEqual(tape.root(), parse(document, 'scan'))
+
+	def test_positions(self):
+		tree = Tape.loads(parse('<f>\n<g/>\n</f>', layout = 'tape').tape.dumps()).tree()
+		tag = tree.elems[1].elems[1]
+		self.assertEqual((tag.line, tag.col), (1, 2))
+
+	def test_damaged(self):
+		data = parse('<f>x</f>', layout = 'tape').tape.dumps()
+		for damaged in ('', data[:-1], data + 'x', 'X' + data[1:], data[:6] + '\x09' + data[7:]):
+			self.assertRaises(ValueError, Tape.loads, damaged)
+
+class TestParseCache(TestCase):
+	document = '<f>a&ltb<g/>\n<h></h><g/></f>c'
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def entries(self):
+		return sorted(path for mtime, size, path in DiskCache(self.directory).entries())
+
+	def test_hit(self):
+		first = parse(self.document, cache = self.directory)
+		self.assertEqual(first, parse(self.document))
+		self.assertEqual(len(self.entries()), 1)
+		second = parse(self.document, cache = self.directory)
+		self.assertEqual(second, parse(self.document))
+		self.assertEqual(repr(second), repr(parse(self.document)))
+		self.assertEqual(parse(self.document, cache = self.directory, layout = 'tape'), parse(self.document))
+		self.assertEqual(parse(self.document + ' ', cache = self.directory), parse(self.document + ' '))
+		self.assertEqual(len(self.entries()), 2)
+
+	def test_loaded(self):
+		# A hit comes from the cache, not from parsing again.
+		parse('<a>x</a>', cache = self.directory)
+		cache = DiskCache(self.directory)
+		other = parse('<b>y</b>', layout = 'tape').tape.dumps()
+		cache.put(cache.key('<a>x</a>'), other)
+		self.assertEqual(parse('<a>x</a>', cache = cache), parse('<b>y</b>'))
+
+	def test_file(self):
+		path = './simphtml/test/test2.html'
+		tree = parse(mapFile(path), cache = self.directory)
+		self.assertEqual(parse(mapFile(path), cache = self.directory), tree)
+		self.assertEqual(tree, parse(mapFile(path)))
+
+	def test_damaged(self):
+		parse(self.document, cache = self.directory)
+		path = self.entries()[0]
+		with open(path, 'rb') as f:
+			entry = f.read()
+		for damaged in (entry[:-3], entry[:10], entry[:-1] + chr(ord(entry[-1]) ^ 1), 'SHCE\x02' + entry[5:]):
+			with open(path, 'wb') as f:
+				f.write(damaged)
+			self.assertEqual(parse(self.document, cache = self.directory), parse(self.document))
+			with open(path, 'rb') as f:
+				self.assertEqual(f.read(), entry)
+
+	def test_old_tape(self):
+		cache = DiskCache(self.directory)
+		data = parse(self.document, layout = 'tape').tape.dumps()
+		cache.put(cache.key(self.document), data[:6] + '\x00\x00' + data[8:])
+		self.assertEqual(parse(self.document, cache = cache), parse(self.document))
+		self.assertEqual(cache.get(cache.key(self.document)), data)
+
+	def test_lru(self):
+		cache = DiskCache(self.directory)
+		for n in range(3):
+			parse('<a>%d</a>' % n, cache = cache)
+			os.utime(cache._path(cache.key('<a>%d</a>' % n)), (n, n))
+		# Room for these three entries but not a fourth.
+		cache.maxSize = sum(size for mtime, size, path in cache.entries()) + 10
+		# Reading the oldest entry makes it the most recently used.
+		self.assertTrue(cache.get(cache.key('<a>0</a>')) is not None)
+		parse('<a>3</a>', cache = cache)
+		self.assertEqual(len(self.entries()), 3)
+		self.assertTrue(cache.get(cache.key('<a>1</a>')) is None)
+		self.assertTrue(cache.get(cache.key('<a>0</a>')) is not None)
+
+	def test_errors(self):
+		self.assertRaises(MatchError, parse, '<a></b>', cache = self.directory)
+		self.assertEqual(self.entries(), [])
+		self.assertRaises(ValueError, parse, self.document, cache = self.directory, layout = 'lazy')
+		self.assertRaises(ValueError, parse, self.document, cache = self.directory, index = True)
@@ -0,0 +1,87 @@
+import itertools
+from unittest import TestCase
+from simphtml import tokenize, parse, ParseError
+from simphtml.tokens import *
+from simphtml.test.EngineTests import TestEngines
+
+def coalescedTrace(lines, engine):
+	"""Returns the coalesced tokens (with their positions) produced for lines by
+the given engine, ending with the position of the TokenizeError if one was
+raised."""
+	trace = []
+	try:
+		for token in tokenize(lines, True, engine, coalesce = True):
+			trace.append((repr(token), token.line, token.col))
+	except TokenizeError as e:
+		trace.append(('TokenizeError', e.line, e.col))
+	return trace
+
+class TestCoalesce(TestCase):
+	def test_run(self):
+		self.assertEqual(tokenize('a&ampb&ltc', coalesce = True), (TextToken('a&b<c'),))
+		self.assertEqual(tokenize('&lt&amp', coalesce = True), (TextToken('<&'),))
+
+	def test_tags(self):
+		self.assertEqual(tokenize('x&lt<f>&amp</f>', coalesce = True),
+		                 (TextToken('x<'), LtToken(), IdToken('f'), GtToken(),
+		                  TextToken('&'), LtToken(), SlashToken(), IdToken('f'), GtToken()))
+
+	def test_position(self):
+		# A run takes the position of its last piece.
+		token = tokenize('ab&lt\ncd<f/>', coalesce = True)[0]
+		self.assertEqual((token.line, token.col), (1, 2))
+		token = tokenize('ab\n&amp', coalesce = True)[0]
+		self.assertEqual((token.line, token.col), (1, 3))
+
+	def test_single(self):
+		# A run of one TextToken is passed on as it is.
+		token = TextToken('abc')
+		self.assertTrue(list(coalesceText([token]))[0] is token)
+
+	def test_engines(self):
+		samples = TestEngines.samples + tuple(''.join(chars)
+			for chars in itertools.product('<>/&ltx\n', repeat = 3))
+		for sample in samples:
+			expected = coalescedTrace(sample, 'dfa')
+			for engine in ('table', 'scan'):
+				self.assertEqual(coalescedTrace(sample, engine), expected)
+				self.assertEqual(coalescedTrace(list(sample), engine), expected)
+
+	def test_stage(self):
+		# The scanning engine's native coalescing agrees with the generic stage.
+		for sample in TestEngines.samples:
+			try:
+				expected = [(repr(token), token.line, token.col)
+				            for token in coalesceText(tokenize(sample, True))]
+			except TokenizeError:
+				continue
+			self.assertEqual(coalescedTrace(sample, 'scan'), expected)
+
+	def test_errors(self):
+		# A parse error in a run of text is reported at the coalesced TextToken.
+		after = 'Expected SlashToken or IdToken after LtToken but got TextToken.'
+		close = 'Expected IdToken then GtToken for CloseTag but got TextToken and %s.'
+		errors = (
+			('\n<&lt<-', ParseError, 1, 4, after),
+			('<&lty/z', ParseError, 0, 6, after),
+			(' <a/> x<&lt&l&lt</ b > ', ParseError, 0, 11, after),
+			('<&ampy/z\n<-/x\n', ParseError, 1, 0, after),
+			('</-&lt>', ParseError, 0, 6, close % 'GtToken'),
+			('<a></&lt&amp/x/&l1', ParseError, 0, 12, close % 'SlashToken'),
+			(' <ax></&lty', ParseError, 0, 7, 'Expected IdToken then GtToken for CloseTag but ran out of tokens.'),
+			('a&ampzyz1</&ampx&>', TokenizeError, 0, 17, None),
+		)
+		for document, errorClass, line, col, reason in errors:
+			for engine in ('dfa', 'table', 'scan'):
+				try:
+					parse(document, engine)
+					self.fail(document)
+				except (ParseError, TokenizeError) as e:
+					self.assertEqual((type(e), e.line, e.col, getattr(e, 'reason', None)),
+					                 (errorClass, line, col, reason))
+
+	def test_cut(self):
+		# A run cut short by a TokenizeError is passed on before it.
+		for engine in ('dfa', 'table', 'scan'):
+			self.assertEqual(coalescedTrace('x&lt&l', engine)[-2:],
+			                 [("TextToken('x<')", 0, 4), ('TokenizeError', 0, 5)])
@@ -0,0 +1,109 @@
+import glob
+import itertools
+import random
+from unittest import TestCase
+from simphtml import tokenize, parse
+from simphtml.tokens import *
+
+def tokenTrace(lines, engine):
+	"""Returns every token (with its position) produced for lines by the given
+engine, ending with the position of the TokenizeError if one was raised."""
+	trace = []
+	try:
+		for token in tokenize(lines, True, engine):
+			trace.append((repr(token), token.line, token.col))
+	except TokenizeError as e:
+		trace.append(('TokenizeError', e.line, e.col))
+	return trace
+
+class TestEngines(TestCase):
+	"""Checks that every alternative engine matches the reference 'dfa' engine."""
+	engines = ('table', 'scan')
+
+	samples = (
+		'', ' ', '\n', 'f', 'a/b', '/b', '>/x', '&lt/x', '&amp;&lt;',
+		'<', '<>', '</>', '<<', '<f', '<fo', '<f/>', '< f >', '< / f >',
+		'<f\n/\n>', '<a-/>', '<_a>', '<!x>', '<-', '<1/>', '<&/>', '<f &>',
+		'&', '&l', '&a', '&am', '&lt', '&amp', '&foo', '&&', '&<', '&a\nmp',
+		'<f>Text</f>', 'text\nwith\nlines\n', '<f>\n</f>\n', 'a<b>c</b>d&lt;e',
+	)
+
+	def assertSameTokens(self, lines):
+		expected = tokenTrace(lines, 'dfa')
+		for engine in self.engines:
+			self.assertEqual(tokenTrace(lines, engine), expected)
+
+	def test_samples(self):
+		for sample in self.samples:
+			self.assertSameTokens(sample)
+
+	def test_exhaustive(self):
+		for length in range(1, 4):
+			for chars in itertools.product('<>/&altmpx1- \n', repeat = length):
+				self.assertSameTokens(''.join(chars))
+
+	def test_random(self):
+		rand = random.Random(1234)
+		for i in range(300):
+			self.assertSameTokens(''.join(rand.choice('<>/&altmpxyz-\n ') for j in range(40)))
+
+	def test_split_lines(self):
+		for sample in self.samples:
+			self.assertSameTokens(list(sample))
+
+	def test_files(self):
+		for path in glob.glob('./simphtml/test/*.html'):
+			with open(path) as f:
+				self.assertSameTokens(f.readlines())
+			with open(path) as f:
+				self.assertSameTokens(f.read())
+
+	def test_parse(self):
+		for engine in self.engines:
+			self.assertEqual(parse('<f> a&ampb <g/></f>', engine), parse('<f> a&ampb <g/></f>'))
+
+	def test_unknown(self):
+		self.assertRaises(ValueError, tokenize, '', False, 'nope')
+
+class TestTokenBuffer(TestCase):
+	def assertSameTokens(self, text):
+		try:
+			buffer = tokenize(text, compact = True)
+			trace = [(repr(token), token.line, token.col) for token in buffer]
+		except TokenizeError as e:
+			trace = [('TokenizeError', e.line, e.col)]
+		expected = tokenTrace(text, 'dfa')
+		if expected and expected[-1][0] == 'TokenizeError':
+			# A buffer is built all at once, so only the error itself is visible.
+			expected = expected[-1:]
+		self.assertEqual(trace, expected)
+
+	def test_samples(self):
+		for sample in TestEngines.samples:
+			self.assertSameTokens(sample)
+
+	def test_random(self):
+		rand = random.Random(4321)
+		for i in range(300):
+			self.assertSameTokens(''.join(rand.choice('<>/&altmpxyz-\n ') for j in range(40)))
+
+	def test_files(self):
+		for path in glob.glob('./simphtml/test/*.html'):
+			with open(path) as f:
+				self.assertSameTokens(f.read())
+
+	def test_offsets(self):
+		buffer = tokenize('a<b>&amp;', compact = True)
+		self.assertEqual(len(buffer), 6)
+		self.assertEqual(buffer.kind(1), LtToken)
+		self.assertEqual(list(buffer.starts), [0, 1, 2, 3, 4, 8])
+		self.assertEqual(list(buffer.ends), [1, 2, 3, 4, 8, 9])
+		self.assertEqual(buffer.text(2), 'b')
+		self.assertEqual(str(buffer.view(5)), ';')
+
+	def test_lines(self):
+		self.assertEqual(tokenize(['<f>a\n', 'b</f>'], compact = True).tokens(), tokenize('<f>a\nb</f>'))
+
+	def test_parse(self):
+		text = '<f> a&ampb <g/>\n</f>'
+		self.assertEqual(parse(tokenize(text, compact = True)), parse(text))
@@ -0,0 +1,71 @@
+import glob
+import itertools
+from unittest import TestCase
+from simphtml import parse, iterparse, MatchError, ParseError, TokenizeError
+from simphtml.parser import Elems, OpenTag, CloseTag, StandaloneTag, Text
+from simphtml.test.EngineTests import TestEngines
+
+def treeOf(events):
+	"""Builds the AST that parse() produces from a stream of parse events."""
+	stack = [[]]
+	for kind, value in events:
+		if kind == 'text':
+			stack[-1].append(Text(value))
+		elif kind == 'standalone':
+			stack[-1].append(StandaloneTag(value))
+		elif kind == 'start':
+			stack[-1].append(OpenTag(value))
+			stack.append([])
+		else:
+			children = stack.pop()
+			if children:
+				stack[-1].append(Elems(tuple(children)))
+			stack[-1].append(CloseTag(value))
+	return Elems(tuple(stack[0]))
+
+def outcome(function, text):
+	"""Returns the result of function(text), or the class of the error it raised."""
+	try:
+		return function(text)
+	except (MatchError, ParseError, TokenizeError) as e:
+		return e.__class__
+
+class TestEvents(TestCase):
+	def documents(self):
+		for path in glob.glob('./simphtml/test/*.html'):
+			with open(path) as f:
+				yield f.read()
+		for sample in TestEngines.samples:
+			yield sample
+		for chars in itertools.product(('<a>', '</a>', '<b>', '</b>', '<a/>', 'x', '&lt', '<', '/', '>'), repeat = 3):
+			yield ''.join(chars)
+
+	def test_same_as_parse(self):
+		for text in self.documents():
+			expected = outcome(parse, text)
+			actual = outcome(lambda text: treeOf(iterparse(text)), text)
+			if isinstance(expected, Elems):
+				self.assertEqual(actual, expected)
+			else:
+				self.assertTrue(actual in (MatchError, ParseError, TokenizeError), text)
+
+	def test_events(self):
+		self.assertEqual(list(iterparse('a&amp;b<f>c<g/></f>')), [
+			('text', 'a&;b'), ('start', 'f'), ('text', 'c'), ('standalone', 'g'), ('end', 'f')])
+
+	def test_fails_at_close_tag(self):
+		events = iterparse('<a>text</b>' + '<c/>' * 10)
+		self.assertEqual(next(events), ('start', 'a'))
+		self.assertEqual(next(events), ('text', 'text'))
+		try:
+			next(events)
+			self.fail('No MatchError')
+		except MatchError as e:
+			self.assertEqual((e.line, e.col), (0, 10))
+
+	def test_errors(self):
+		self.assertRaises(MatchError, list, iterparse('<a>'))
+		self.assertRaises(MatchError, list, iterparse('</a>'))
+		self.assertRaises(ParseError, list, iterparse('<a/'))
+		self.assertRaises(ParseError, list, iterparse('</a<'))
+		self.assertRaises(TokenizeError, list, iterparse('&x'))
@@ -0,0 +1,64 @@
+import glob
+from unittest import TestCase
+from simphtml import ScanTokenStream
+from simphtml.tokens import TokenizeError
+from simphtml.test.EngineTests import TestEngines, tokenTrace
+
+def feedTrace(chunks):
+	"""Returns the token trace (see tokenTrace) for pushing chunks through a
+ScanTokenStream.  Only the error is traced if one is raised, as the tokens of
+the chunk that raised it are never returned."""
+	stream = ScanTokenStream()
+	tokens = []
+	try:
+		for chunk in chunks:
+			tokens += stream.feed(chunk)
+		tokens += stream.close()
+	except TokenizeError as e:
+		return [('TokenizeError', e.line, e.col)]
+	return [(repr(token), token.line, token.col) for token in tokens]
+
+def expectedTrace(text):
+	"""Returns the trace feedTrace should produce for text."""
+	trace = tokenTrace(text, 'dfa')
+	if trace and trace[-1][0] == 'TokenizeError':
+		return trace[-1:]
+	return trace
+
+class TestFeed(TestCase):
+	def documents(self):
+		for path in glob.glob('./simphtml/test/*.html'):
+			with open(path) as f:
+				yield f.read()
+		for sample in TestEngines.samples:
+			yield sample
+
+	def test_every_split(self):
+		for text in self.documents():
+			expected = expectedTrace(text)
+			for i in range(len(text) + 1):
+				self.assertEqual(feedTrace((text[:i], text[i:])), expected)
+
+	def test_every_double_split(self):
+		for text in TestEngines.samples:
+			expected = expectedTrace(text)
+			for i in range(len(text) + 1):
+				for j in range(i, len(text) + 1):
+					self.assertEqual(feedTrace((text[:i], text[i:j], text[j:])), expected)
+
+	def test_byte_at_a_time(self):
+		for text in self.documents():
+			self.assertEqual(feedTrace(text), expectedTrace(text))
+
+	def test_incremental(self):
+		stream = ScanTokenStream()
+		self.assertEqual([repr(token) for token in stream.feed('ab<f')], ["TextToken('ab')", "LtToken()"])
+		self.assertEqual([repr(token) for token in stream.feed('oo>&a')], ["IdToken('foo')", "GtToken()"])
+		self.assertEqual([repr(token) for token in stream.feed('mp')], [])
+		self.assertEqual([repr(token) for token in stream.close()], ["EscapeAmpToken()"])
+		self.assertRaises(ValueError, stream.feed, 'x')
+
+	def test_error_while_receiving(self):
+		stream = ScanTokenStream()
+		stream.feed('<f>\n')
+		self.assertRaises(TokenizeError, stream.feed, ' &x')
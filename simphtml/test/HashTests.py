@@ -0,0 +1,49 @@
+from unittest import TestCase
+from simphtml import parse
+from simphtml.parser import *
+
+class TestHash(TestCase):
+	document = '<ul><li>a&ltb<br/></li>\n<li>a&ltb<br/></li>\n<li>c</li></ul>'
+
+	def test_equal(self):
+		tree = parse(self.document)
+		for other in (parse(self.document, 'scan'), parse(self.document, layout = 'tape'),
+		              parse(self.document, shared = True), parse(self.document, hashcons = True)):
+			self.assertEqual(hash(other), hash(tree))
+		self.assertEqual(hash(Text('a')), hash(Text('a')))
+		self.assertEqual(hash(OpenTag('a', 5)), hash(OpenTag('a')))
+		self.assertEqual(hash(Elems()), hash(Elems(())))
+
+	def test_keys(self):
+		trees = set([parse(self.document), parse(self.document, 'scan'), parse('<ul></ul>')])
+		self.assertEqual(len(trees), 2)
+		self.assertTrue(parse('<ul></ul>', layout = 'tape') in trees)
+		self.assertEqual(len(set([OpenTag('a'), CloseTag('a'), Text('a'), OpenTag('a')])), 3)
+
+	def test_short_circuit(self):
+		first = parse('<a>x</a>')
+		second = parse('<a>x</a>')
+		hash(first)
+		hash(second)
+		# A stale hash shows the mismatch is found without comparing elements.
+		second._hash += 1
+		self.assertNotEqual(first, second)
+
+	def test_deep(self):
+		document = '<a>' * 10000 + 'x' + '</a>' * 10000
+		self.assertEqual(hash(parse(document, 'scan')), hash(parse(document, 'scan', layout = 'tape')))
+
+class TestHashCons(TestCase):
+	def test_equal(self):
+		for document in ('', 'x', TestHash.document, '<a><b/>x<b/>x</a><a><b/>x<b/>x</a>'):
+			self.assertEqual(parse(document, hashcons = True), parse(document))
+
+	def test_shared(self):
+		tree = parse(TestHash.document, hashcons = True)
+		items = tree.elems[1].elems
+		self.assertTrue(items[0] is items[4])
+		self.assertTrue(items[1] is items[5])
+		self.assertTrue(items[2] is items[6])
+		self.assertTrue(items[3] is items[7])
+		self.assertTrue(items[1] is not items[9])
+		self.assertEqual(items[0].offset, None)
@@ -0,0 +1,43 @@
+import pickle
+from unittest import TestCase
+from simphtml import parse
+from simphtml.parser import *
+
+class TestTagIndex(TestCase):
+	document = '<ul>\n<li>a<b>x</b></li>\n<li><b/></li>\n</ul><title>T</title>'
+
+	def test_queries(self):
+		tree = parse(self.document, index = True)
+		self.assertEqual(tree.findAll('b'), (OpenTag('b'), StandaloneTag('b')))
+		self.assertEqual(tree.count('li'), 2)
+		self.assertEqual(tree.first('title'), OpenTag('title'))
+		self.assertEqual((tree.findAll('x'), tree.count('x'), tree.first('x')), ((), 0, None))
+		self.assertEqual(sorted(tree.tagIndex.ids()), ['b', 'li', 'title', 'ul'])
+
+	def test_nodes(self):
+		# The index holds the very tags in the tree, with their positions.
+		tree = parse(self.document, index = True)
+		self.assertTrue(tree.first('ul') is tree.elems[0])
+		items = tree.elems[1].elems
+		self.assertTrue(tree.findAll('li')[1] is items[5])
+		self.assertEqual((items[5].line, items[5].col), (2, 3))
+
+	def test_where(self):
+		tree = parse(self.document, index = True)
+		ul, li = tree.first('ul'), tree.findAll('li')[1]
+		self.assertEqual(tree.tagIndex.where('li'), [(tree.findAll('li')[0], ul, 1), (li, ul, 1)])
+		self.assertTrue(tree.tagIndex.where('b')[1][1] is li)
+		self.assertEqual(tree.tagIndex.where('title'), [(tree.first('title'), None, 0)])
+
+	def test_tree(self):
+		tree = parse(self.document, index = True)
+		self.assertEqual(tree, parse(self.document))
+		self.assertEqual(repr(tree), repr(parse(self.document)))
+		self.assertEqual(parse(self.document, hashcons = True, index = True).count('b'), 2)
+		copy = pickle.loads(pickle.dumps(tree, 2))
+		self.assertEqual(copy, tree)
+		self.assertEqual(copy.count('li'), 2)
+
+	def test_layouts(self):
+		self.assertRaises(ValueError, parse, self.document, layout = 'tape', index = True)
+		self.assertRaises(ValueError, parse, self.document, layout = 'lazy', index = True)
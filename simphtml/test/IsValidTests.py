@@ -1,5 +1,8 @@
+import glob
+import itertools
+import random
 from unittest import TestCase
-from simphtml import isValid
+from simphtml import isValid, mapFile
 
 class TestSingleLine(TestCase):
 	def test_empty(self):
@@ -49,3 +52,29 @@ class TestSingleLine(TestCase):
 		self.assertFalse(isValid('<f></g>'))
 		self.assertFalse(isValid('<f><f><g></f>'))
 		self.assertFalse(isValid('<f><g></f></g>'))
+
+class TestValidator(TestCase):
+	"""Checks the dedicated validator against the verdict of parse()."""
+	def assertSameVerdict(self, text):
+		self.assertEqual(isValid(text), isValid(text, 'dfa'), text)
+
+	def test_fixtures(self):
+		for path in glob.glob('./simphtml/test/*.html'):
+			with open(path) as f:
+				self.assertSameVerdict(f.read())
+			self.assertEqual(isValid(mapFile(path)), isValid(open(path), 'dfa'))
+
+	def test_combinations(self):
+		pieces = ('<a>', '</a>', '<b>', '</b>', '<a/>', 'x', '&lt', '&', '<', '/', '>', ' ')
+		for length in range(1, 4):
+			for chars in itertools.product(pieces, repeat = length):
+				self.assertSameVerdict(''.join(chars))
+
+	def test_random(self):
+		rand = random.Random(99)
+		for i in range(500):
+			self.assertSameVerdict(''.join(rand.choice(('<a>', '</a>', '<b/>', 'x', '<', '>', '/', '&amp', '\n')) for j in range(12)))
+
+	def test_lines(self):
+		self.assertTrue(isValid(['<a', '>te', 'xt</', 'a>']))
+		self.assertFalse(isValid(['<a', '>te', 'xt</', 'b>']))
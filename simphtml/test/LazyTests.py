@@ -0,0 +1,91 @@
+import glob
+import pickle
+import random
+from unittest import TestCase
+from simphtml import parse, mapFile, MatchError, ParseError
+from simphtml.parser import *
+from simphtml.tokens import TokenizeError
+
+def errorOf(function, *args, **kwargs):
+	"""Returns the class and position of the error function raises, or None."""
+	try:
+		function(*args, **kwargs)
+	except (MatchError, ParseError, TokenizeError) as e:
+		return (e.__class__, e.line, e.col)
+	return None
+
+def walk(tree):
+	"""Reads every element of tree, nested Elems included."""
+	pending = [tree]
+	while pending:
+		pending.extend(elem for elem in pending.pop().elems if elem.isElems())
+
+class TestLazy(TestCase):
+	samples = ('', 'a', '&lt', '<f/>', '<f></f>', '<f>a&ltb<g/>\n<h></h><g/></f>c',
+	           '<a><b><c>x</c></b>y</a>z', '< a >x< / a >', '<a >\n<b />\n</a >')
+
+	def test_equal(self):
+		for sample in self.samples:
+			tree = parse(sample, layout = 'lazy')
+			self.assertEqual(tree, parse(sample))
+			self.assertEqual(repr(tree), repr(parse(sample)))
+
+	def test_files(self):
+		for path in glob.glob('./simphtml/test/*.html'):
+			if errorOf(parse, mapFile(path)) is None:
+				self.assertEqual(parse(mapFile(path), layout = 'lazy'), parse(mapFile(path)))
+
+	def test_random(self):
+		rand = random.Random(1234)
+		for i in range(200):
+			document = ''
+			openIds = []
+			for j in range(30):
+				choice = rand.randrange(4)
+				if choice == 0:
+					openIds.append(rand.choice('ab'))
+					document += '<%s>' % openIds[-1]
+				elif choice == 1 and openIds:
+					document += '</%s>' % openIds.pop()
+				else:
+					document += rand.choice(('x', '&lt', '\n', '<c/>'))
+			document += ''.join('</%s>' % id for id in reversed(openIds))
+			self.assertEqual(parse(document, layout = 'lazy'), parse(document))
+
+	def test_lazy(self):
+		tree = parse('<a><b>x</b></a><c>y</c>', layout = 'lazy')
+		self.assertFalse(tree.isParsed())
+		elems = tree.elems
+		self.assertTrue(tree.isParsed())
+		self.assertFalse(elems[1].isParsed())
+		self.assertFalse(elems[4].isParsed())
+		self.assertEqual(elems[1].elems[1], Elems((Text('x'),)))
+		self.assertFalse(elems[4].isParsed())
+
+	def test_errors(self):
+		for document in ('<a>ok</a><b>\n<c>x&x</c></b>', '<a>\n<b>\n<c/ x>\n</b></a>',
+		                 '<a><b>\n>\n</b></a>', '<a><b>\n<c>x</d></b></a>', '<a>\n<b>&am</b></a>'):
+			tree = parse(document, layout = 'lazy')
+			expected = errorOf(parse, document)
+			self.assertTrue(expected is not None)
+			self.assertEqual(errorOf(walk, tree), expected)
+
+	def test_mismatched(self):
+		# The tags are paired up differently, so the error is found at another tag.
+		for document in ('<a><b></a></b>', '<a><b>\n<c>\n</b></a>'):
+			self.assertRaises(MatchError, walk, parse(document, layout = 'lazy'))
+
+	def test_strict(self):
+		self.assertEqual(errorOf(parse, '<a><b>\n<c>x&x</c></b></a>', layout = 'lazy', strict = True),
+		                 (TokenizeError, 1, 5))
+		self.assertEqual(parse('<a>x</a>', layout = 'lazy', strict = True), parse('<a>x</a>'))
+
+	def test_pickle(self):
+		tree = parse('<a><b>x</b></a>', layout = 'lazy')
+		copy = pickle.loads(pickle.dumps(tree, 2))
+		self.assertEqual(copy.__class__, Elems)
+		self.assertEqual(copy, tree)
+
+	def test_deep(self):
+		document = '<a>' * 10000 + 'x' + '</a>' * 10000
+		self.assertEqual(parse(document, layout = 'lazy'), parse(document, 'scan'))
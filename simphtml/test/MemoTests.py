@@ -0,0 +1,69 @@
+from unittest import TestCase
+from simphtml import parse, isValid, ParseMemo, MatchError
+from simphtml.parser import *
+from simphtml.test.LazyTests import errorOf
+
+class TestParseMemo(TestCase):
+	document = '<f>a&ltb<g/>\n<h></h><g/></f>c'
+
+	def test_parse(self):
+		memo = ParseMemo()
+		for i in range(3):
+			self.assertEqual(memo.parse(self.document), parse(self.document))
+			self.assertEqual(memo.parse(list(self.document)), parse(self.document))
+		self.assertEqual(memo.parse(self.document, 'tape'), parse(self.document))
+		self.assertEqual((memo.hits, memo.misses, len(memo)), (6, 1, 1))
+		tag = memo.parse(self.document).elems[1].elems[3]
+		self.assertEqual((tag.id, tag.line, tag.col), ('h', 1, 2))
+
+	def test_copies(self):
+		# Each call gets a tree of its own.
+		memo = ParseMemo()
+		first = memo.parse(self.document)
+		first.elems[1].elems[0].text = 'changed'
+		self.assertEqual(memo.parse(self.document), parse(self.document))
+		self.assertTrue(memo.parse(self.document) is not memo.parse(self.document))
+
+	def test_errors(self):
+		memo = ParseMemo()
+		for document in ('<a>\n</b>', '<a>\n<', 'x\n&x', '<a>'):
+			expected = errorOf(parse, document)
+			self.assertEqual(errorOf(memo.parse, document), expected)
+			self.assertEqual(errorOf(memo.parse, document), expected)
+		self.assertEqual((memo.hits, memo.misses), (4, 4))
+		try:
+			memo.parse('<a>\n</b>')
+		except MatchError as e:
+			self.assertEqual(e.reason, "Close tag 'b' does not match open tag 'a'.")
+
+	def test_is_valid(self):
+		memo = ParseMemo()
+		for document in ('<a>x</a>', '<a>', '', '<a></b>'):
+			self.assertEqual(memo.isValid(document), isValid(document))
+			self.assertEqual(memo.isValid(document), isValid(document))
+		self.assertEqual((memo.hits, memo.misses), (4, 4))
+		memo.parse('<b/>')
+		self.assertTrue(memo.isValid('<b/>'))
+		self.assertEqual((memo.hits, memo.misses, len(memo)), (5, 5, 5))
+
+	def test_entries(self):
+		memo = ParseMemo(maxEntries = 2)
+		memo.parse('<a/>')
+		memo.parse('<b/>')
+		memo.parse('<a/>')
+		memo.parse('<c/>')
+		self.assertEqual((len(memo), memo.evictions), (2, 1))
+		memo.parse('<a/>')
+		memo.parse('<b/>')
+		self.assertEqual((memo.hits, memo.misses, memo.evictions), (2, 4, 2))
+
+	def test_bytes(self):
+		memo = ParseMemo(maxBytes = 10000)
+		memo.parse('x' * 5000)
+		memo.parse('y' * 5000)
+		self.assertEqual((len(memo), memo.evictions), (1, 1))
+		self.assertTrue(memo.byteSize() <= 10000)
+		memo.parse('z' * 20000)
+		self.assertEqual((len(memo), memo.byteSize()), (0, 0))
+		memo.clear()
+		self.assertEqual(len(memo), 0)
@@ -0,0 +1,61 @@
+import glob
+from unittest import TestCase
+from simphtml import tokenize, mapFile, TokenBuffer, TokenizeError
+from simphtml.bench.generator import generateDocument
+from simphtml.test.EngineTests import tokenTrace
+
+def bufferTrace(lines, **kwargs):
+	"""Returns the kind codes, starts and ends of the TokenBuffer scanned from
+lines, or the position of the TokenizeError raised instead."""
+	try:
+		tokens = TokenBuffer.scan(lines, **kwargs)
+	except TokenizeError as e:
+		return ('TokenizeError', e.line, e.col, e.offset)
+	return (list(tokens.kindCodes), list(tokens.starts), list(tokens.ends))
+
+class TestParallelScan(TestCase):
+	samples = (
+		'', 'text', '<', 'ab<', '<ab', '<a>x</a>', '<f/>\n<g />', '<<b  >&lt&amp</b>text',
+		'x&amp<x', 'a&lt<b>', '<a>\n&l<b>', 'a&a<b>', '<a>0<1</a>', '<a><-b>', '<a/ b>', 'x\n>\n<<>',
+	)
+
+	def test_chunks(self):
+		# Every possible split of each sample, in this process and in a pool.
+		for sample in self.samples:
+			expected = bufferTrace(sample)
+			for chunkSize in range(1, len(sample) + 2):
+				self.assertEqual(bufferTrace(sample, workers = 1, chunkSize = chunkSize), expected)
+		for sample in self.samples[-4:]:
+			self.assertEqual(bufferTrace(sample, workers = 2, chunkSize = 2), bufferTrace(sample))
+
+	def test_error(self):
+		# An error in the middle of many chunks, with the chunks after it still in the pool.
+		document = generateDocument(256 << 10)
+		document = document[:len(document) / 2] + '&x' + document[len(document) / 2:]
+		expected = bufferTrace(document)
+		self.assertEqual(expected[0], 'TokenizeError')
+		for i in range(5):
+			self.assertEqual(bufferTrace(document, workers = 3, chunkSize = 32768), expected)
+
+	def test_files(self):
+		for path in glob.glob('./simphtml/test/*.html'):
+			expected = bufferTrace(open(path).read())
+			for chunkSize in (1, 7, 64):
+				self.assertEqual(bufferTrace(mapFile(path), workers = 1, chunkSize = chunkSize), expected)
+			self.assertEqual(bufferTrace(mapFile(path), workers = 2, chunkSize = 7), expected)
+
+	def test_tokenize(self):
+		for path in glob.glob('./simphtml/test/*.html'):
+			text = open(path).read()
+			expected = tokenTrace(text, 'dfa')
+			trace = []
+			try:
+				for token in tokenize(text, workers = 2):
+					trace.append((repr(token), token.line, token.col))
+			except TokenizeError as e:
+				# Nothing comes back from a document with an error but the error.
+				self.assertEqual(trace, [])
+				trace = expected[:-1] + [('TokenizeError', e.line, e.col)]
+			self.assertEqual(trace, expected)
+			if expected[-1][0] != 'TokenizeError':
+				self.assertEqual(tokenize(text, coalesce = True, workers = 2), tokenize(text, coalesce = True))
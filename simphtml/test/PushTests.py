@@ -0,0 +1,85 @@
+import glob
+from unittest import TestCase
+from simphtml import parse, iterparse, PushParser, MatchError, ParseError, TokenizeError
+
+def pushTrace(text, size, build = True):
+	"""Returns the events and tree from pushing text through a PushParser in
+chunks of the given size, or the position of the error raised instead."""
+	parser = PushParser(build)
+	events = []
+	try:
+		for start in range(0, len(text), size):
+			events += parser.feed(text[start:start + size])
+		events += parser.close()
+	except (MatchError, ParseError, TokenizeError) as e:
+		return (type(e), e.line, e.col)
+	return (events, parser.root)
+
+def expectedTrace(text):
+	"""Returns the trace pushTrace should produce for text."""
+	try:
+		return (list(iterparse(text)), parse(text))
+	except (MatchError, ParseError, TokenizeError) as e:
+		return (type(e), e.line, e.col)
+
+class TestPushParser(TestCase):
+	samples = (
+		'', 'text', '<a>x&amp</a>\n<b/>', '<a/ >', '< / a >', '</a>', '<a', '<a>', '<a></b>', 'x<',
+		'<a>0<1</a>', '<a><-b>', '<a/ b>', 'x\n>\n<<>', '/x', '<a>&l<b>', '<a>&lt</a', '<a>x\n</a>y',
+		# An error before a bad character in the same chunk is raised first.
+		'/<-', 'x>&x', '<a>\n</b>&x', '<&lty/z', ' <ax></&lty', 'a&ampzyz1</&ampx&>',
+	)
+
+	def documents(self):
+		for path in glob.glob('./simphtml/test/*.html'):
+			yield open(path).read()
+		for sample in self.samples:
+			yield sample
+
+	def test_chunks(self):
+		for document in self.documents():
+			expected = expectedTrace(document)
+			for size in range(1, len(document) + 2):
+				self.assertEqual(pushTrace(document, size), expected)
+
+	def test_events(self):
+		# Events come back as soon as they are complete.
+		parser = PushParser()
+		self.assertEqual(parser.feed('<a>te'), [('start', 'a')])
+		self.assertEqual(parser.feed('xt<'), [])
+		self.assertEqual(parser.feed('/a'), [('text', 'text')])
+		self.assertEqual(parser.feed('><b/>'), [('end', 'a')])
+		self.assertEqual(parser.close(), [('standalone', 'b')])
+		self.assertEqual(parser.root, parse('<a>text</a><b/>'))
+		parser = PushParser()
+		parser.feed('<a>\n')
+		self.assertEqual(parser.feed('</b'), [('text', '\n')])
+		self.assertRaises(MatchError, parser.feed, '>\n')
+
+	def test_long_run(self):
+		# A long run of text is joined as it arrives, rather than held as tokens.
+		document = '<a>' + 'x&amp' * 20000 + '</a>'
+		parser = PushParser()
+		events = []
+		for start in range(0, len(document), 64):
+			events += parser.feed(document[start:start + 64])
+			self.assertTrue(len(parser._tag) < 4)
+		events += parser.close()
+		self.assertEqual((events, parser.root), expectedTrace(document))
+
+	def test_positions(self):
+		parser = PushParser()
+		for char in '<f>a&ltb<g/>\n<h></h><g/></f>c':
+			parser.feed(char)
+		parser.close()
+		tag = parser.root.elems[1].elems[3]
+		self.assertEqual((tag.id, tag.line, tag.col), ('h', 1, 2))
+
+	def test_validate(self):
+		for document in self.documents():
+			trace = pushTrace(document, 3, False)
+			expected = expectedTrace(document)
+			if isinstance(expected[0], list):
+				self.assertEqual(trace, (expected[0], None))
+			else:
+				self.assertEqual(trace, expected)
@@ -0,0 +1,87 @@
+import glob
+from unittest import TestCase
+from simphtml import parse, MatchError, ParseError, TokenizeError
+from simphtml.parser import *
+
+def describe(errors):
+	"""Returns the class, position and reason of each of the given errors."""
+	return [(type(e), e.line, e.col, getattr(e, 'reason', None)) for e in errors]
+
+class TestRecover(TestCase):
+	samples = (
+		'<a>x&amp</a>', '<a/ >', '</a>x', '<a', '<a>', '<a></b>', 'x<', '<a>0<1</a>', '<a><-b>', '<a/ b>',
+		'x\n>\n<<>', '/x', '<a>&l<b>', '<a><b><c></a>d', '<a b c>t</a>', 'a&x b<c/>d', '<a !>x</a>', '<><a !>',
+		# Escapes after a '<'.
+		' <a/> x<&lt&l&lt</ b > ', '&amp<&lt&lt&l', '<&ampy/z\n<-/x\n', '\n<&lt<-', '<&lty/z', '</-&lt>',
+		' <ax></&lty', 'a&ampzyz1</&ampx&>', '<a></&lt&amp/x/&l1', '<a/&lt&l',
+	)
+
+	def documents(self):
+		for path in glob.glob('./simphtml/test/*.html'):
+			yield open(path).read()
+		for sample in self.samples:
+			yield sample
+
+	def test_valid(self):
+		for document in self.documents():
+			try:
+				expected = parse(document)
+			except (MatchError, ParseError, TokenizeError):
+				continue
+			self.assertEqual(parse(document, recover = True), (expected, []))
+
+	def test_first_error(self):
+		# The first error recovered from is the one parse() raises.
+		for document in self.documents():
+			try:
+				parse(document)
+				continue
+			except (MatchError, ParseError, TokenizeError) as e:
+				expected = describe([e])
+			tree, errors = parse(document, recover = True)
+			self.assertEqual(describe(errors[:1]), expected)
+
+	def test_inputs(self):
+		for document in self.documents():
+			tree, errors = parse(document, recover = True)
+			for lines in (document.splitlines(True), bytearray(document), list(document)):
+				self.assertEqual(describe(parse(lines, recover = True)[1]), describe(errors))
+				self.assertEqual(parse(lines, recover = True)[0], tree)
+
+	def test_match(self):
+		tree, errors = parse('<a><b><c>x</a>\n</b><d></d>\n<e>', recover = True)
+		self.assertEqual(tree, parse('<a><b><c>x</c></b></a>\n<d></d>\n<e></e>'))
+		self.assertEqual(describe(errors), [
+			(MatchError, 0, 13, "Close tag 'a' does not match open tag 'c'."),
+			(MatchError, 1, 3, "Close tag 'b' with no matching open tag."),
+			(MatchError, 2, 2, "Missing close tag for open tag 'e'."),
+		])
+		# The implied close tags have no position.
+		self.assertEqual(tree.elems[1].elems[1].elems[2].position(), (None, None))
+		tree, errors = parse('<a><b>x</c></b></a>', recover = True)
+		self.assertEqual(tree, parse('<a><b>x</b></a>'))
+		self.assertEqual(describe(errors), [(MatchError, 0, 10, "Close tag 'c' does not match open tag 'b'.")])
+
+	def test_resync(self):
+		tree, errors = parse('a<1b>c<d/>e&x f<g>h\n<i j>k</g><l/ >m&amp', recover = True)
+		self.assertEqual(tree, parse('a<d/>e<g>h\nk</g><l/>m&amp'))
+		self.assertEqual(describe(errors), [
+			(TokenizeError, 0, 2, None),
+			(TokenizeError, 0, 12, None),
+			(ParseError, 1, 4, 'Expected SlashToken or GtToken after IdToken but got IdToken.'),
+		])
+		tree, errors = parse('a\n&l', recover = True)
+		self.assertEqual((tree, describe(errors)), (parse('a\n'), [(TokenizeError, 1, 1, None)]))
+
+	def test_many(self):
+		tree, errors = parse('<a>' + 'x<1></b><c d>' * 1000 + '</a>', recover = True)
+		self.assertEqual(tree, parse('<a>' + 'x' * 1000 + '</a>'))
+		self.assertEqual(len(errors), 3000)
+		self.assertEqual([type(e) for e in errors[:3]], [TokenizeError, MatchError, ParseError])
+
+	def test_options(self):
+		document = '<a><b/></c><b/></a>'
+		self.assertEqual(parse(document, recover = True, index = True)[0].count('b'), 2)
+		self.assertEqual(parse(document, recover = True, hashcons = True)[0], parse(document, recover = True)[0])
+		self.assertRaises(ValueError, parse, document, layout = 'tape', recover = True)
+		self.assertRaises(ValueError, parse, document, cache = '/tmp', recover = True)
@@ -0,0 +1,73 @@
+import glob
+import random
+from unittest import TestCase
+from simphtml import parse, serialize, mapFile
+from simphtml.parser import *
+from simphtml.test.LazyTests import errorOf
+
+class Writes(object):
+	"""File-like object that keeps each write made to it."""
+	def __init__(self):
+		self.writes = []
+
+	def write(self, text):
+		self.writes.append(text)
+
+class TestSerialize(TestCase):
+	samples = ('', 'a', '&lt', '&amp', 'a&ltb&ampc', '&ampamp', '<f/>', '<f></f>',
+	           '<f>a&ltb<g/>\n<h></h><g/></f>c', '< a >x< / a >', '<a >\n<b />\n</a >')
+
+	def assertRoundTrip(self, tree):
+		self.assertEqual(parse(serialize(tree)), tree)
+
+	def test_samples(self):
+		for sample in self.samples:
+			self.assertRoundTrip(parse(sample))
+
+	def test_output(self):
+		self.assertEqual(serialize(parse('< a >x&lty&ampz< b / ></ a >')), '<a>x&lty&ampz<b/></a>')
+		self.assertEqual(serialize(Elems((Text('a<b&c'),))), 'a&ltb&ampc')
+
+	def test_files(self):
+		for path in glob.glob('./simphtml/test/*.html'):
+			if errorOf(parse, mapFile(path)) is None:
+				self.assertRoundTrip(parse(mapFile(path)))
+
+	def test_random(self):
+		rand = random.Random(1234)
+		for i in range(200):
+			document = ''.join(rand.choice(('<a>', '</a>', '<b/>', 'x', '&lt', '&amp', '\n')) for j in range(20))
+			if errorOf(parse, document) is None:
+				self.assertRoundTrip(parse(document))
+
+	def test_layouts(self):
+		document = '<f>a&ltb<g/>\n<h></h><g/></f>c'
+		for layout in ('tape', 'lazy'):
+			self.assertEqual(serialize(parse(document, layout = layout)), serialize(parse(document)))
+
+	def test_deep(self):
+		document = '<a>' * 10000 + 'x' + '</a>' * 10000
+		self.assertEqual(serialize(parse(document, 'scan')), document)
+
+	def test_buffered(self):
+		tree = parse('<a>' + 'x&lt<b/>\n' * 50000 + '</a>', 'scan')
+		out = Writes()
+		serialize(tree, out)
+		self.assertEqual(''.join(out.writes), serialize(tree))
+		self.assertTrue(len(out.writes) > 1)
+		for write in out.writes[:-1]:
+			self.assertTrue(len(write) >= 4096)
+
+	def test_unicode(self):
+		tree = Elems((OpenTag(u'a'), Elems((Text(u'caf\xe9 & <'),)), CloseTag(u'a')))
+		self.assertEqual(serialize(tree), u'<a>caf\xe9 &amp &lt</a>')
+
+	def test_gt(self):
+		self.assertRaises(ValueError, serialize, Elems((Text('a>b'),)))
+
+	def test_slash(self):
+		for text in ('/path', 'a</b', 'a&/b', '&/'):
+			self.assertRaises(ValueError, serialize, Elems((Text(text),)))
+		self.assertRaises(ValueError, serialize, Elems((OpenTag('a'), Elems((Text('/x'),)), CloseTag('a'))))
+		tree = Elems((Text('a/b< /c'),))
+		self.assertRoundTrip(tree)
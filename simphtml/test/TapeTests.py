@@ -0,0 +1,62 @@
+import glob
+import pickle
+from unittest import TestCase
+from simphtml import parse, match, mapFile
+from simphtml.parser import *
+
+class TestTape(TestCase):
+	samples = ('', 'a', '&lt', '<f/>', '<f></f>', '<f>a&ltb<g/>\n<h></h><g/></f>c',
+	           '<a><b><c>x</c></b>y</a>z', '<a></a><b><c/></b>')
+
+	def test_equal(self):
+		for sample in self.samples:
+			for engine in ('dfa', 'scan'):
+				tape = parse(sample, engine, layout = 'tape')
+				self.assertEqual(tape, parse(sample))
+				self.assertEqual(parse(sample), tape)
+				self.assertEqual(repr(tape), repr(parse(sample)))
+
+	def test_files(self):
+		for path in glob.glob('./simphtml/test/*.html'):
+			try:
+				tree = parse(mapFile(path))
+			except Exception as e:
+				self.assertRaises(e.__class__, parse, mapFile(path), layout = 'tape')
+			else:
+				self.assertEqual(parse(mapFile(path), layout = 'tape'), tree)
+
+	def test_not_equal(self):
+		self.assertNotEqual(parse('<a></a>', layout = 'tape'), parse('<a>x</a>'))
+		self.assertNotEqual(parse('<a>x</a>', layout = 'tape'), parse('<a>y</a>'))
+
+	def test_arrays(self):
+		tape = parse('<a><b>x</b></a>y&lt<c/>', layout = 'tape').tape
+		self.assertEqual([tape.kind(node) for node in range(len(tape))],
+		                 [Elems, OpenTag, Elems, OpenTag, Elems, Text, CloseTag, CloseTag, Text, StandaloneTag])
+		self.assertEqual(list(tape.ends), [10, 2, 7, 4, 6, 6, 7, 8, 9, 10])
+		self.assertEqual(list(tape.children(0)), [1, 2, 7, 8, 9])
+		self.assertEqual(tape.end(2), 7)
+		self.assertEqual((tape.id(9), tape.text(8), tape.ids), ('c', 'y<', ['a', 'b', 'c']))
+
+	def test_positions(self):
+		tree = parse('<f>\n<g/>\n</f>', layout = 'tape')
+		tags = tree.elems[1].elems
+		self.assertEqual((tags[1].line, tags[1].col), (1, 2))
+		self.assertEqual((tree.elems[2].line, tree.elems[2].col), (2, 3))
+
+	def test_pickle(self):
+		tree = parse(mapFile('./simphtml/test/test2.html'), layout = 'tape')
+		for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+			copy = pickle.loads(pickle.dumps(tree, protocol))
+			self.assertEqual(copy, tree)
+			self.assertEqual(copy.elems[0].line, 0)
+
+	def test_match(self):
+		match(parse('<a><b/></a>', layout = 'tape'))
+
+	def test_deep(self):
+		document = '<a>' * 10000 + 'x' + '</a>' * 10000
+		self.assertEqual(parse(document, 'scan', layout = 'tape'), parse(document, 'scan'))
+
+	def test_unknown(self):
+		self.assertRaises(ValueError, parse, '', layout = 'nope')
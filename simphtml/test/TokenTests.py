@@ -151,3 +151,12 @@ class TestTokenPos(TestCase):
 		self.assertEqual(tokenize('<>')[1].col, 1)
 		self.assertEqual(tokenize('<\n>')[1].line, 1)
 		self.assertEqual(tokenize('<\n>')[1].col, 0)
+
+	def test_offset(self):
+		self.assertEqual(tokenize('<\n>')[1].offset, 2)
+		self.assertEqual(tokenize('ab\ncd<')[0].offset, 5)
+		self.assertEqual(tokenize('ab\ncd<')[0].position(), (1, 2))
+
+	def test_end_of_input(self):
+		self.assertEqual(tokenize('text\n')[0].position(), (0, 4))
+		self.assertEqual(tokenize('text\n\n')[0].position(), (1, 0))
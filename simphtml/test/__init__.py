@@ -2,3 +2,20 @@ from TokenTests import *
 from IsValidTests import *
 from AstTests import *
 from FileTests import *
+from EngineTests import *
+from BufferTests import *
+from FeedTests import *
+from EventTests import *
+from CoalesceTests import *
+from TapeTests import *
+from HashTests import *
+from LazyTests import *
+from IndexTests import *
+from SerializeTests import *
+from CacheTests import *
+from MemoTests import *
+from BatchTests import *
+from ParallelTests import *
+from PushTests import *
+from RecoverTests import *
+from BenchTests import *
@@ -1,24 +1,157 @@
 import string
 import os
+import re
+import mmap
+import multiprocessing
+from array import array
 from cStringIO import StringIO
 from types import StringType
+from itertools import izip, imap
+from positions import LineIndex, Located, _newline
 
-def tokenize(lines, generator = False):
-	"""Returns a sequence of simple HTML tokens for the given lines of text.  If generator is True, returns a generator instead of an explicit sequence."""
-	# If lines is actually a string, tack on newlines and build an array.
-	if isinstance(lines, ''.__class__):
-		lines = lines.split(os.linesep)
-		if len(lines) > 0:
-			lastLine = lines[-1]
-			lines = [line + os.linesep for line in lines[:-1]]
-			lines = lines + [lastLine]
-	return TokenStream(lines).tokens(generator)
-
-class Token(object):
-	"""Base class for all token types."""
-	def __init__(self, line = None, col = None):
-		self.line = line
-		self.col = col
+def tokenize(lines, generator = False, engine = 'dfa', compact = False, coalesce = False, workers = None):
+	"""Returns a sequence of simple HTML tokens for the given lines of text.  If generator is True, returns a generator instead of an explicit sequence.
+The engine names the tokenizer implementation to use: 'dfa' (the default), 'table' or 'scan'.
+If compact is True, returns a TokenBuffer built by the scanning engine instead.
+If coalesce is True, each run of text is returned as a single TextToken (see
+coalesceText).
+
+Besides an iterable of lines, the input may be a whole document held in a
+string, bytearray, memoryview, buffer or mmap object (see mapFile), or a file
+object, which is memory mapped.  These are tokenized in place rather than
+being copied into lines first.
+
+If workers is given, the document is tokenized by the scanning engine in that
+many processes (see TokenBuffer.scan), with exactly the same results."""
+	if compact or workers is not None:
+		tokens = TokenBuffer.scan(lines, workers)
+		if compact:
+			return tokens
+		tokens = coalesceText(iter(tokens)) if coalesce else iter(tokens)
+		return tokens if generator else tuple(tokens)
+	try:
+		streamClass = _engines[engine]
+	except KeyError:
+		raise ValueError("Unknown tokenizer engine '%s'." % engine)
+	chunks = _chunks(lines)
+	if chunks is None:
+		stream = streamClass(lines)
+	else:
+		stream = streamClass.fromChunks(chunks)
+	if coalesce:
+		tokens = stream.textRuns()
+		return tokens if generator else tuple(tokens)
+	return stream.tokens(generator)
+
+def coalesceText(tokens):
+	"""Generator that passes on the given tokens, replacing each maximal run of
+TextTokens and escapes with a single TextToken holding the run's text, at the
+position of the run's last token.  The text is joined once, however many
+escapes the run contains.  A run cut short by a TokenizeError is passed on
+before the error is raised, as the tokens of the run would have been."""
+	run = []
+	try:
+		for token in tokens:
+			if token.isTextToken():
+				run.append(token)
+				continue
+			if run:
+				yield _textRunToken(run)
+				run = []
+			yield token
+	except TokenizeError as e:
+		if run:
+			yield _textRunToken(run)
+		raise e
+	if run:
+		yield _textRunToken(run)
+
+def _textRunToken(run):
+	"""Returns the single TextToken for a run of text tokens."""
+	last = run[-1]
+	if len(run) == 1 and isinstance(last, TextToken):
+		return last
+	return TextToken(''.join([token.text for token in run]), last.offset, last.index)
+
+def mapFile(path):
+	"""Returns a read-only memory map of the file at path that can be passed to
+tokenize(), parse() or isValid() in place of the document text."""
+	with open(path, 'rb') as f:
+		return _mapFile(f)
+
+def _mapFile(f):
+	"""Memory maps the whole of the given file object.  Returns None if the file
+can't be mapped (pipes, sockets and the like) and '' for an empty file, which
+can't be mapped either."""
+	try:
+		fileno = f.fileno()
+		if os.fstat(fileno).st_size == 0:
+			return ''
+		return mmap.mmap(fileno, 0, access = mmap.ACCESS_READ)
+	except (AttributeError, EnvironmentError, ValueError, mmap.error):
+		return None
+
+# Size of the pieces a memoryview is copied out in, as re can't search one directly.
+_memoryChunkSize = 1 << 20
+
+def _memoryChunks(view):
+	"""Generator that copies a memoryview out one bounded chunk at a time."""
+	for start in xrange(0, len(view), _memoryChunkSize):
+		yield view[start:start + _memoryChunkSize].tobytes()
+
+def _chunks(source):
+	"""Returns the given document as a sequence of chunks that can be scanned in
+place, or None if it is an iterable of lines that has to be read as such."""
+	if isinstance(source, (basestring, buffer, mmap.mmap)):
+		return (source,)
+	elif isinstance(source, bytearray):
+		# Indexing a bytearray gives ints; a buffer over it gives characters.
+		return (buffer(source),)
+	elif isinstance(source, memoryview):
+		return _memoryChunks(source)
+	elif isinstance(source, file):
+		mapped = _mapFile(source)
+		if mapped is not None:
+			return (mapped,)
+	return None
+
+def _source(lines):
+	"""Returns the given document (anything tokenize() accepts) held in a single
+buffer.  Lines of text are joined, and a memoryview is copied."""
+	chunks = _chunks(lines)
+	if chunks is None:
+		return ''.join(lines)
+	elif isinstance(chunks, tuple):
+		return chunks[0]
+	return ''.join(chunks)
+
+def _linesOf(chunks):
+	"""Generator that re-splits a sequence of chunks into lines that keep their
+newline.  Like str.split, a final (possibly empty) line is always produced."""
+	partial = ''
+	for chunk in chunks:
+		start = 0
+		for match in _newline.finditer(chunk):
+			end = match.end()
+			yield partial + chunk[start:end]
+			partial = ''
+			start = end
+		partial += chunk[start:]
+	yield partial
+
+def _chunksIndex(chunks):
+	"""Returns a lazily built LineIndex for a document held in a single buffer, or
+None if the index has to be recorded as the chunks are read."""
+	if isinstance(chunks, tuple) and len(chunks) == 1:
+		return LineIndex(chunks[0])
+	return None
+
+class Token(Located):
+	"""Base class for all token types.  A token's offset is that of the character
+that completed it (the one following it, or the last one in the document)."""
+	def __init__(self, offset = None, index = None):
+		self.offset = offset
+		self.index = index
 
 	def __eq__(self, other):
 		return isinstance(other, self.__class__)
@@ -57,8 +190,8 @@ class EscapeAmpToken(BaseTextToken):
 
 class TextToken(BaseTextToken):
 	"""Token type representing a block of normal text."""
-	def __init__(self, text, line = None, col = None):
-		Token.__init__(self, line, col)
+	def __init__(self, text, offset = None, index = None):
+		Token.__init__(self, offset, index)
 		self.text = text
 
 	def __eq__(self, other):
@@ -72,8 +205,8 @@ class TextToken(BaseTextToken):
 
 class IdToken(Token):
 	"""Token type representing an identifer for a tag."""
-	def __init__(self, id, line = None, col = None):
-		Token.__init__(self, line, col)
+	def __init__(self, id, offset = None, index = None):
+		Token.__init__(self, offset, index)
 		self.id = id
 
 	def __eq__(self, other):
@@ -89,14 +222,21 @@ class IdToken(Token):
 
 class TokenizeError(Exception):
 	"""Error class for providing line/col position where tokenize errors occur."""
-	def __init__(self):
+	def __init__(self, line = None, col = None, offset = None):
 		Exception.__init__(self)
-		self.line = None
-		self.col = None
+		self.line = line
+		self.col = col
+		self.offset = offset
 
 	def isError(self):
 		"""Returns True if this instance represents an error, False otherwise."""
-		return self.line is not None and self.col is not None
+		return self.offset is not None or (self.line is not None and self.col is not None)
+
+	def locate(self, index):
+		"""Fills in the line/col of this error's offset from the given LineIndex, if any, and returns the error."""
+		if index is not None:
+			self.line, self.col = index.position(self.offset)
+		return self
 
 class TokenState(object):
 	"""Pseudo enum class to represent the state diagram for extracting tokens."""
@@ -128,8 +268,10 @@ TokenState.initStates()
 
 class TokenStream(object):
 	"""Provides an iterable stream of tokens for the given lines of text."""
-	def __init__(self, lines):
+	def __init__(self, lines, index = None):
 		self._lines = lines
+		# LineIndex over the whole document, or None to record one from the lines.
+		self._index = index
 		self._token = None
 		self._prevChars = StringIO()
 		self._currState = TokenState.START
@@ -158,19 +300,19 @@ class TokenStream(object):
 			TokenState.AMP_P: self._ampP,
 		}
 
-	def _makeTextToken(self, lineNum, charPos):
+	def _makeTextToken(self, offset):
 		"""Grab the current character buffer and produce a TextToken token."""
-		self._token = TextToken(self._prevChars.getvalue(), lineNum, charPos)
+		self._token = TextToken(self._prevChars.getvalue(), offset, self._index)
 		self._prevChars.close()
 		self._prevChars = StringIO()
 
-	def _makeIdToken(self, lineNum, charPos):
+	def _makeIdToken(self, offset):
 		"""Grab the current character buffer and produce a IdToken token."""
-		self._token = IdToken(self._prevChars.getvalue(), lineNum, charPos)
+		self._token = IdToken(self._prevChars.getvalue(), offset, self._index)
 		self._prevChars.close()
 		self._prevChars = StringIO()
 
-	def _start(self, char, lineNum, charPos, error):
+	def _start(self, char, offset, error):
 		if char == '':
 			return TokenState.END
 		elif char == '<':
@@ -185,28 +327,28 @@ class TokenStream(object):
 			self._prevChars.write(char)
 			return TokenState.TEXT
 
-	def _end(self, char, lineNum, charPos, error):
+	def _end(self, char, offset, error):
 		return None
 
-	def _text(self, char, lineNum, charPos, error):
+	def _text(self, char, offset, error):
 		if char == '':
-			self._makeTextToken(lineNum, charPos)
+			self._makeTextToken(offset)
 			return TokenState.END
 		elif char == '<':
-			self._makeTextToken(lineNum, charPos)
+			self._makeTextToken(offset)
 			return TokenState.LT
 		elif char == '>':
-			self._makeTextToken(lineNum, charPos)
+			self._makeTextToken(offset)
 			return TokenState.GT
 		elif char == '&':
-			self._makeTextToken(lineNum, charPos)
+			self._makeTextToken(offset)
 			return TokenState.AMP
 		else:
 			self._prevChars.write(char)
 			return TokenState.TEXT
 
-	def _gt(self, char, lineNum, charPos, error):
-		self._token = GtToken(lineNum, charPos)
+	def _gt(self, char, offset, error):
+		self._token = GtToken(offset, self._index)
 		if char == '':
 			return TokenState.END
 		elif char == '<':
@@ -218,8 +360,8 @@ class TokenStream(object):
 		else:
 			return TokenState.START
 
-	def _lt(self, char, lineNum, charPos, error):
-		self._token = LtToken(lineNum, charPos)
+	def _lt(self, char, offset, error):
+		self._token = LtToken(offset, self._index)
 		if char == '':
 			return TokenState.END
 		elif char == '<':
@@ -234,14 +376,13 @@ class TokenStream(object):
 		elif char in string.whitespace:
 			return TokenState.TAG_WHITE
 		elif char in string.digits or char == '-':
-			error.line = lineNum
-			error.col = charPos
+			error.offset = offset
 			return None
 		else:
 			return TokenState.START
 
-	def _slash(self, char, lineNum, charPos, error):
-		self._token = SlashToken(lineNum, charPos)
+	def _slash(self, char, offset, error):
+		self._token = SlashToken(offset, self._index)
 		if char == '':
 			return TokenState.END
 		elif char == '>':
@@ -254,34 +395,34 @@ class TokenStream(object):
 		else:
 			return TokenState.START
 
-	def _idStart(self, char, lineNum, charPos, error):
+	def _idStart(self, char, offset, error):
 		if char == '':
 			return TokenState.END
 		elif char in string.letters or char in string.digits or char == '-':
 			self._prevChars.write(char)
 			return TokenState.ID_NONSTART
 		elif char in string.whitespace:
-			self._makeIdToken(lineNum, charPos)
+			self._makeIdToken(offset)
 			return TokenState.TAG_WHITE
 		else:
-			self._makeIdToken(lineNum, charPos)
+			self._makeIdToken(offset)
 			return TokenState.START
 
-	def _idNonStart(self, char, lineNum, charPos, error):
+	def _idNonStart(self, char, offset, error):
 		if char == '':
-			self._makeIdToken(lineNum, charPos)
+			self._makeIdToken(offset)
 			return TokenState.END
 		elif char in string.letters or char in string.digits or char == '-':
 			self._prevChars.write(char)
 			return TokenState.ID_NONSTART
 		elif char in string.whitespace:
-			self._makeIdToken(lineNum, charPos)
+			self._makeIdToken(offset)
 			return TokenState.TAG_WHITE
 		else:
-			self._makeIdToken(lineNum, charPos)
+			self._makeIdToken(offset)
 			return TokenState.START
 
-	def _tagWhite(self, char, lineNum, charPos, error):
+	def _tagWhite(self, char, offset, error):
 		if char == '':
 			return TokenState.END
 		elif char == '<':
@@ -296,11 +437,10 @@ class TokenStream(object):
 		elif char in string.whitespace:
 			return TokenState.TAG_WHITE
 		else:
-			error.line = lineNum
-			error.col = charPos
+			error.offset = offset
 			return None
 
-	def _amp(self, char, lineNum, charPos, error):
+	def _amp(self, char, offset, error):
 		if char == '':
 			return TokenState.END
 		elif char == 'l':
@@ -308,92 +448,103 @@ class TokenStream(object):
 		elif char == 'a':
 			return TokenState.AMP_A
 		else:
-			error.line = lineNum
-			error.col = charPos
+			error.offset = offset
 			return None
 
-	def _ampL(self, char, lineNum, charPos, error):
+	def _ampL(self, char, offset, error):
 		if char == '':
-			error.line = lineNum
-			error.col = charPos
+			error.offset = offset
 			return None
 		elif char == 't':
 			return TokenState.AMP_T
 		else:
-			error.line = lineNum
-			error.col = charPos
+			error.offset = offset
 			return None
 
-	def _ampT(self, char, lineNum, charPos, error):
-		self._token = EscapeLtToken(lineNum, charPos)
+	def _ampT(self, char, offset, error):
+		self._token = EscapeLtToken(offset, self._index)
 		if char == '':
 			return TokenState.END
 		else:
 			return TokenState.START
 
-	def _ampA(self, char, lineNum, charPos, error):
+	def _ampA(self, char, offset, error):
 		if char == '':
-			error.line = lineNum
-			error.col = charPos
+			error.offset = offset
 			return None
 		elif char == 'm':
 			return TokenState.AMP_M
 		else:
-			error.line = lineNum
-			error.col = charPos
+			error.offset = offset
 			return None
 
-	def _ampM(self, char, lineNum, charPos, error):
+	def _ampM(self, char, offset, error):
 		if char == '':
-			error.line = lineNum
-			error.col = charPos
+			error.offset = offset
 			return None
 		elif char == 'p':
 			return TokenState.AMP_P
 		else:
-			error.line = lineNum
-			error.col = charPos
+			error.offset = offset
 			return None
 
-	def _ampP(self, char, lineNum, charPos, error):
-		self._token = EscapeAmpToken(lineNum, charPos)
+	def _ampP(self, char, offset, error):
+		self._token = EscapeAmpToken(offset, self._index)
 		if char == '':
 			return TokenState.END
 		else:
 			return TokenState.START
 
+	@classmethod
+	def fromChunks(cls, chunks):
+		"""Returns a stream over a document given as a sequence of arbitrary chunks."""
+		return cls(_linesOf(chunks), _chunksIndex(chunks))
+
 	def __iter__(self):
 		return self._nextToken()
 
-	def _nextState(self, char, lineNum, charPos, error):
+	def _nextState(self, char, offset, error):
 		"""Transitions from the current state to the next state."""
-		self._currState = self._parseNext[self._currState](char, lineNum, charPos, error)
+		self._currState = self._parseNext[self._currState](char, offset, error)
+
+	# Whether self._index is recorded from the lines as they are read.
+	_recordIndex = False
+
+	def _lineIndex(self):
+		"""Returns this stream's LineIndex and whether it has to be recorded from the lines."""
+		if self._index is None:
+			self._index = LineIndex()
+			self._recordIndex = True
+		return (self._index, self._recordIndex)
 
 	def _nextToken(self):
 		"""Generator method that yields a stream of tokens."""
 		error = TokenizeError()
-		# Predefine these so they are guaranteed to be defined after the loops.
-		lineNum = -1
-		charPos = -1
-		for lineNum, line in enumerate(self._lines):
-			for charPos, char in enumerate(line):
-				self._nextState(char, lineNum, charPos, error)
+		index, record = self._lineIndex()
+		# Offset of the start of the current line.
+		base = 0
+		for line in self._lines:
+			if record:
+				index.extend(line, base)
+			for offset, char in enumerate(line, base):
+				self._nextState(char, offset, error)
 
 				# Don't eat the current char if we just moved back to the start state.
 				if self._currState == TokenState.START:
-					self._nextState(char, lineNum, charPos, error)
+					self._nextState(char, offset, error)
 
 				# Check for errors and yield the current token if one was produced.
 				if error.isError():
-					raise error
+					raise error.locate(index)
 				elif self._token is not None:
 					yield self._token
 					self._token = None
+			base += len(line)
 
-		# Flush the last state.
-		self._nextState('', lineNum, charPos, error)
+		# Flush the last state at the last character.
+		self._nextState('', base - 1, error)
 		if error.isError():
-			raise error
+			raise error.locate(index)
 		elif self._token is not None:
 			yield self._token
 			self._token = None
@@ -401,6 +552,621 @@ class TokenStream(object):
 	def tokens(self, generator = False):
 		"""Returns a tuple of tokens for this TokenStream."""
 		if generator:
-			return (token for token in self)
+			return iter(self)
 		else:
 			return tuple(self)
+
+	def textRuns(self):
+		"""Returns an iterator over this TokenStream's tokens with each run of text
+coalesced into a single TextToken."""
+		return coalesceText(iter(self))
+
+# Character classes shared by the scanning engine.
+_letters = frozenset(string.letters)
+_idStartErrors = frozenset(string.digits + '-')
+_whitespace = frozenset(string.whitespace)
+_textRun = re.compile('[^<>&]+')
+_ltChar = re.compile('<')
+_idRun = re.compile('[%s]+' % re.escape(string.letters + string.digits + '-'))
+
+class ScanTokenStream(TokenStream):
+	"""Produces exactly the same tokens (and token/error positions) as TokenStream,
+but jumps over runs of plain text and identifiers with a single regular
+expression match instead of stepping the DFA once per character.  Tag and
+escape states are still processed a character at a time.
+
+The scanner itself (_scan/_flush) works on absolute offsets and can be resumed
+at any chunk boundary, so it also backs TokenBuffer and can tokenize a whole
+document buffer without splitting it into lines.
+
+It can also be used push style, without any lines: feed() it each chunk of a
+document as it arrives, getting back the tokens completed so far, then call
+close() to get the rest.  Chunks may be split anywhere, even inside a tag,
+identifier or escape."""
+	def __init__(self, lines = None, index = None):
+		self._lines = lines
+		self._index = index
+		self._state = TokenState.START
+		# Absolute offset of the start of the next chunk.
+		self._base = 0
+		# Absolute offset where the current TextToken or IdToken began.
+		self._runStart = 0
+		# Parts of the current TextToken or IdToken that came from earlier chunks.
+		self._pieces = []
+		# If True, errors are scanned as records rather than raised (see _error).
+		self.recovering = False
+		# Whether the scanner is skipping to the next '<' after an error.
+		self._skipping = False
+
+	@classmethod
+	def fromChunks(cls, chunks):
+		"""Returns a stream over a document given as a sequence of arbitrary chunks."""
+		return cls(chunks, _chunksIndex(chunks))
+
+	def feed(self, chunk):
+		"""Tokenizes the next chunk of the document and returns a list of the tokens
+it completed.  Raises a TokenizeError as soon as a bad character is fed."""
+		return list(self._feedTokens(chunk))
+
+	def close(self):
+		"""Ends the document and returns a list of any tokens still pending."""
+		return list(self._closeTokens())
+
+	def _nextToken(self):
+		"""Generator method that yields a stream of tokens."""
+		for chunk in self._lines:
+			for token in self._feedTokens(chunk):
+				yield token
+		for token in self._closeTokens():
+			yield token
+
+	def textRuns(self, flush = True):
+		"""Generator method that yields a stream of tokens with each run of text
+coalesced into a single TextToken.  Unlike coalesceText, this works on the
+scanned records, so the pieces of a run never become tokens of their own.
+
+If flush is False, the lines are taken to be the start of a longer document,
+and the stream stops where they do, without ending the document."""
+		# Text of the current run, and the offset of its last piece.
+		run = []
+		runOffset = None
+		try:
+			for chunk, base, records, last in self._chunkRecords(self._lines, flush):
+				for tokenClass, start, end in records:
+					# Tokens flushed at the end of the document are at its last character.
+					offset = end - 1 if last else end
+					if tokenClass is TextToken:
+						run.append(self._runText(chunk, base, start, end))
+						runOffset = offset
+					elif tokenClass is EscapeLtToken or tokenClass is EscapeAmpToken:
+						run.append(tokenClass.text)
+						runOffset = offset
+					else:
+						if run:
+							yield TextToken(''.join(run), runOffset, self._index)
+							run = []
+						if tokenClass is TokenizeError:
+							yield TokenizeError(offset = start).locate(self._index)
+							continue
+						yield self._makeToken(tokenClass, chunk, base, start, end, offset)
+		except TokenizeError as e:
+			# Pass on the run the error cut short first, as coalesceText does.
+			if run:
+				yield TextToken(''.join(run), runOffset, self._index)
+			raise e
+		if run:
+			yield TextToken(''.join(run), runOffset, self._index)
+
+	def _chunkRecords(self, chunks, flush = True):
+		"""Generator that yields (chunk, base offset, records, last) for each chunk
+scanned, recording the line index as it goes, followed (if flush is True) by
+one for the end of the document, where last is True."""
+		index, record = self._lineIndex()
+		for chunk in chunks:
+			if record:
+				index.extend(chunk, self._base)
+			yield (chunk, self._base, self._scan(chunk), False)
+		if flush:
+			yield ('', self._base, self._flush(), True)
+
+	def _feedTokens(self, chunk):
+		"""Generator that yields the tokens completed by the next chunk."""
+		if self._state == TokenState.END:
+			raise ValueError('Cannot feed a closed token stream.')
+		index, record = self._lineIndex()
+		base = self._base
+		if record:
+			index.extend(chunk, base)
+		for tokenClass, start, end in self._scan(chunk):
+			yield self._makeToken(tokenClass, chunk, base, start, end, end)
+
+	def _closeTokens(self):
+		"""Generator that yields the token, if any, that the document ended in."""
+		self._lineIndex()
+		# Flush the last state at the last character.
+		for tokenClass, start, end in self._flush():
+			yield self._makeToken(tokenClass, '', self._base, start, end, end - 1)
+
+	def _makeToken(self, tokenClass, chunk, base, start, end, offset):
+		"""Builds the token for a (tokenClass, start, end) record scanned from chunk."""
+		if tokenClass is TextToken or tokenClass is IdToken:
+			return tokenClass(self._runText(chunk, base, start, end), offset, self._index)
+		return tokenClass(offset, self._index)
+
+	def _runText(self, chunk, base, start, end):
+		"""Returns the text of a TextToken or IdToken record scanned from chunk."""
+		text = chunk[max(start - base, 0):end - base]
+		if self._pieces:
+			text = ''.join(self._pieces) + text
+		return text
+
+	def _scan(self, chunk):
+		"""Generator that scans one chunk of input, continuing from wherever the
+previous chunk left off, and yields a (token class, start, end) record of
+absolute offsets for each completed token."""
+		S = TokenState
+		textRun = _textRun.match
+		idRun = _idRun.match
+		state = self._state
+		base = self._base
+		runStart = self._runStart
+		i = 0
+		n = len(chunk)
+		if self._skipping:
+			i = self._resync(chunk, 0)
+		while i < n:
+			char = chunk[i]
+			if state == S.START or state == S.TEXT:
+				if char == '<':
+					nextState = S.LT
+				elif char == '>':
+					nextState = S.GT
+				elif char == '&':
+					nextState = S.AMP
+				elif char == '/' and state == S.START:
+					nextState = S.SLASH
+				else:
+					if state == S.START:
+						runStart = base + i
+						state = S.TEXT
+					i = textRun(chunk, i).end()
+					continue
+				if state == S.TEXT:
+					yield (TextToken, runStart, base + i)
+					self._pieces = []
+				state = nextState
+				i += 1
+			elif state == S.ID_START or state == S.ID_NONSTART:
+				match = idRun(chunk, i)
+				if match is not None:
+					state = S.ID_NONSTART
+					i = match.end()
+					continue
+				yield (IdToken, runStart, base + i)
+				self._pieces = []
+				if char in _whitespace:
+					state = S.TAG_WHITE
+					i += 1
+				else:
+					state = S.START
+			elif state == S.LT or state == S.SLASH:
+				if state == S.LT:
+					if char in _idStartErrors:
+						yield self._error(base + i)
+						state = S.START
+						i = self._resync(chunk, i)
+						continue
+					yield (LtToken, base + i - 1, base + i)
+				else:
+					yield (SlashToken, base + i - 1, base + i)
+				if char in _letters:
+					runStart = base + i
+					state = S.ID_START
+					i += 1
+				elif char in _whitespace:
+					state = S.TAG_WHITE
+					i += 1
+				elif char == '>':
+					state = S.GT
+					i += 1
+				else:
+					state = S.START
+			elif state == S.GT:
+				yield (GtToken, base + i - 1, base + i)
+				state = S.START
+			elif state == S.TAG_WHITE:
+				if char in _whitespace:
+					pass
+				elif char == '<':
+					state = S.LT
+				elif char == '>':
+					state = S.GT
+				elif char == '/':
+					state = S.SLASH
+				elif char in _letters:
+					runStart = base + i
+					state = S.ID_START
+				else:
+					yield self._error(base + i)
+					state = S.START
+					i = self._resync(chunk, i)
+					continue
+				i += 1
+			elif state == S.AMP_T:
+				yield (EscapeLtToken, base + i - 3, base + i)
+				state = S.START
+			elif state == S.AMP_P:
+				yield (EscapeAmpToken, base + i - 4, base + i)
+				state = S.START
+			else:
+				state = _escapeNext.get((state, char))
+				if state is None:
+					yield self._error(base + i)
+					state = S.START
+					i = self._resync(chunk, i)
+					continue
+				i += 1
+
+		# Keep the part of an unfinished run that lies in this chunk.
+		if state == S.TEXT or state == S.ID_START or state == S.ID_NONSTART:
+			self._pieces.append(chunk[max(runStart - base, 0):])
+		self._state = state
+		self._base = base + n
+		self._runStart = runStart
+
+	def _flush(self):
+		"""Generator that yields the records for whatever token the input ended in."""
+		S = TokenState
+		state = self._state
+		end = self._base
+		self._state = S.END
+		if state == S.TEXT:
+			yield (TextToken, self._runStart, end)
+		elif state == S.ID_NONSTART:
+			yield (IdToken, self._runStart, end)
+		elif state == S.LT:
+			yield (LtToken, end - 1, end)
+		elif state == S.SLASH:
+			yield (SlashToken, end - 1, end)
+		elif state == S.GT:
+			yield (GtToken, end - 1, end)
+		elif state == S.AMP_T:
+			yield (EscapeLtToken, end - 3, end)
+		elif state == S.AMP_P:
+			yield (EscapeAmpToken, end - 4, end)
+		elif state in (S.AMP_L, S.AMP_A, S.AMP_M):
+			yield self._error(end - 1)
+		self._pieces = []
+
+	def _error(self, offset):
+		"""Raises the TokenizeError for a bad character at offset, unless
+recovering, in which case it returns a (TokenizeError, offset, offset) record
+for it, and the scanner goes on from the next '<' (see _resync)."""
+		if not self.recovering:
+			raise TokenizeError(offset = offset).locate(self._index)
+		return (TokenizeError, offset, offset)
+
+	def _resync(self, chunk, i):
+		"""Returns the index of the next '<' in chunk from i, or the end of the
+chunk if there isn't one, in which case the next chunk is skipped to its
+first '<' too."""
+		self._pieces = []
+		match = _ltChar.search(chunk, i)
+		self._skipping = match is None
+		return len(chunk) if match is None else match.start()
+
+# Transitions through the partial escape states; anything missing is an error.
+_escapeNext = {
+	(TokenState.AMP, 'l'): TokenState.AMP_L,
+	(TokenState.AMP, 'a'): TokenState.AMP_A,
+	(TokenState.AMP_L, 't'): TokenState.AMP_T,
+	(TokenState.AMP_A, 'm'): TokenState.AMP_M,
+	(TokenState.AMP_M, 'p'): TokenState.AMP_P,
+}
+
+class CharClass(object):
+	"""Pseudo enum class for the character classes the TokenState transitions
+distinguish between.  Every character maps to exactly one class."""
+	_classes = (
+		'EOF',
+		'LT',
+		'GT',
+		'AMP',
+		'SLASH',
+		'L',
+		'T',
+		'A',
+		'M',
+		'P',
+		'LETTER',
+		'DIGIT',
+		'DASH',
+		'WHITE',
+		'OTHER',
+	)
+
+	# One representative character per class, used to compile the transition table.
+	_representatives = ('', '<', '>', '&', '/', 'l', 't', 'a', 'm', 'p', 'x', '0', '-', ' ', '!')
+
+	@classmethod
+	def initClasses(cls):
+		for id, charClass in enumerate(CharClass._classes):
+			setattr(cls, charClass, id)
+
+	@classmethod
+	def of(cls, char):
+		"""Returns the class code of a single character."""
+		if char in cls._representatives[:cls.LETTER]:
+			return cls._representatives.index(char)
+		elif char in string.letters:
+			return cls.LETTER
+		elif char in string.digits:
+			return cls.DIGIT
+		elif char == '-':
+			return cls.DASH
+		elif char in string.whitespace:
+			return cls.WHITE
+		else:
+			return cls.OTHER
+
+# Set up the various character class constants.
+CharClass.initClasses()
+
+# Maps every byte to its character class; anything else (unicode) is CharClass.OTHER.
+_charClasses = dict((chr(code), CharClass.of(chr(code))) for code in range(256))
+
+def _compileTransition(stream, state, char):
+	"""Runs one TokenStream step from the given state on char and returns the
+(emitted token class, write char, next state row) triple describing it.  The
+next state row is None if the step is an error."""
+	stream._token = None
+	stream._prevChars = StringIO()
+	stream._currState = state
+	error = TokenizeError()
+	stream._nextState(char, 0, error)
+	# Don't eat the current char if we just moved back to the start state.
+	if stream._currState == TokenState.START:
+		stream._nextState(char, 0, error)
+	if error.isError() or stream._currState is None:
+		return (None, False, None)
+	emit = stream._token.__class__ if stream._token is not None else None
+	write = char != '' and stream._prevChars.getvalue() == char
+	return (emit, write, stream._currState * len(CharClass._classes))
+
+def _compileTable():
+	"""Compiles the TokenStream state handlers into a flat transition table
+indexed by state * number of classes + character class."""
+	stream = TokenStream(())
+	return tuple(_compileTransition(stream, state, char)
+	             for state in range(len(TokenState._states))
+	             for char in CharClass._representatives)
+
+_transitions = _compileTable()
+
+class TableTokenStream(TokenStream):
+	"""Runs the same state machine as TokenStream, but as a precompiled flat
+transition table: each character costs one character class lookup and one
+table lookup instead of a handler method call and several membership tests."""
+	def __init__(self, lines, index = None):
+		self._lines = lines
+		self._index = index
+
+	def _nextToken(self):
+		"""Generator method that yields a stream of tokens."""
+		index, record = self._lineIndex()
+		table = _transitions
+		classOf = _charClasses.get
+		other = CharClass.OTHER
+		row = TokenState.START * len(CharClass._classes)
+		# Characters of the TextToken or IdToken currently being built.
+		chars = []
+		# Offset of the start of the current line.
+		base = 0
+		for line in self._lines:
+			if record:
+				index.extend(line, base)
+			for offset, char in enumerate(line, base):
+				emit, write, row = table[row + classOf(char, other)]
+				if row is None:
+					raise TokenizeError(offset = offset).locate(index)
+				if emit is not None:
+					if emit is TextToken or emit is IdToken:
+						yield emit(''.join(chars), offset, index)
+						chars = []
+					else:
+						yield emit(offset, index)
+				if write:
+					chars.append(char)
+			base += len(line)
+
+		# Flush the last state at the last character.
+		offset = base - 1
+		emit, write, row = table[row + CharClass.EOF]
+		if row is None:
+			raise TokenizeError(offset = offset).locate(index)
+		if emit is TextToken or emit is IdToken:
+			yield emit(''.join(chars), offset, index)
+		elif emit is not None:
+			yield emit(offset, index)
+
+class TokenBuffer(object):
+	"""Compact struct-of-arrays token sequence.  Each token is stored as a kind code
+plus start/end offsets into the source buffer; Token objects are only created
+on demand when the buffer is indexed or iterated, and TextToken/IdToken text is
+sliced from the source at that point.
+
+Token offsets are the same as the other engines report (the character that
+completed the token, or the last character at end of input), and are resolved
+to lines through a LineIndex over the source that is built on first use."""
+	# Token class for each kind code.
+	kinds = (TextToken, IdToken, LtToken, GtToken, SlashToken, EscapeLtToken, EscapeAmpToken)
+
+	def __init__(self, source):
+		self.source = source
+		self.kindCodes = array('B')
+		self.starts = array('l')
+		self.ends = array('l')
+		self.index = LineIndex(source)
+
+	@classmethod
+	def scan(cls, lines, workers = None, chunkSize = None):
+		"""Tokenizes the given document (anything tokenize() accepts) into a new
+TokenBuffer.  Lines of text are joined, and a memoryview is copied.
+
+If workers is given, the document is split into chunks of about chunkSize
+characters that are tokenized speculatively in a pool of that many worker
+processes (or in this one, for 1), then stitched together here.  The tokens,
+and any TokenizeError, are exactly those of tokenizing it serially."""
+		source = _source(lines)
+		if workers is not None:
+			return cls._scanParallel(source, workers, chunkSize or _parallelChunkSize)
+		tokens = cls(source)
+		codes = _kindCodes
+		appendKind = tokens.kindCodes.append
+		appendStart = tokens.starts.append
+		appendEnd = tokens.ends.append
+		stream = ScanTokenStream(None, tokens.index)
+		for records in (stream._scan(source), stream._flush()):
+			for tokenClass, start, end in records:
+				appendKind(codes[tokenClass])
+				appendStart(start)
+				appendEnd(end)
+		return tokens
+
+	@classmethod
+	def _scanParallel(cls, source, workers, chunkSize):
+		"""Tokenizes source in chunks, in parallel.  Each chunk but the first starts
+at a '<', and is tokenized as if the scanner were in its start state there.
+That guess always holds: whatever state the scanner is really in, a '<'
+completes the token pending in it (or is an error) and leaves it in the LT
+state, just as it does from the start state.  So the boundaries are repaired
+by scanning each chunk's '<' from the state the chunk before really ended in,
+which completes the token straddling the boundary.
+
+The pool is never terminated while chunks are in flight, which can deadlock
+it.  After an error no more chunks are handed out, and the pool is closed and
+left to finish those it already has."""
+		tokens = cls(source)
+		bounds = _splitPoints(source, chunkSize)
+		# Set once the chunks after the current one are no longer wanted.
+		stopped = []
+		def chunks():
+			# Each chunk's text is passed to its worker, so they need not be forked from this process.
+			for start, end in bounds:
+				if stopped:
+					return
+				yield (start, source[start:end])
+		pool = None
+		try:
+			if workers == 1:
+				results = imap(_scanChunk, chunks())
+			else:
+				pool = multiprocessing.Pool(workers)
+				results = pool.imap(_scanChunk, chunks())
+			stream = ScanTokenStream(None, tokens.index)
+			for (start, end), (kindCodes, starts, ends, state, runStart, error) in izip(bounds, results):
+				if start:
+					stream._base = start
+					for tokenClass, tokenStart, tokenEnd in stream._scan('<'):
+						tokens.kindCodes.append(_kindCodes[tokenClass])
+						tokens.starts.append(tokenStart)
+						tokens.ends.append(tokenEnd)
+				if error is not None:
+					raise TokenizeError(offset = error).locate(tokens.index)
+				tokens.kindCodes.extend(kindCodes)
+				tokens.starts.extend(starts)
+				tokens.ends.extend(ends)
+				stream._state = state
+				stream._runStart = runStart
+			stream._base = len(source)
+			for tokenClass, tokenStart, tokenEnd in stream._flush():
+				tokens.kindCodes.append(_kindCodes[tokenClass])
+				tokens.starts.append(tokenStart)
+				tokens.ends.append(tokenEnd)
+		finally:
+			stopped.append(True)
+			if pool is not None:
+				pool.close()
+				pool.join()
+		return tokens
+
+	def __len__(self):
+		return len(self.kindCodes)
+
+	def __iter__(self):
+		for index in xrange(len(self.kindCodes)):
+			yield self[index]
+
+	def __getitem__(self, index):
+		"""Returns a Token view of the token at index."""
+		tokenClass = self.kinds[self.kindCodes[index]]
+		offset = min(self.ends[index], len(self.source) - 1)
+		if tokenClass is TextToken or tokenClass is IdToken:
+			return tokenClass(self.text(index), offset, self.index)
+		return tokenClass(offset, self.index)
+
+	def kind(self, index):
+		"""Returns the token class of the token at index without creating a token."""
+		return self.kinds[self.kindCodes[index]]
+
+	def text(self, index):
+		"""Returns the text of the token at index as a slice of the source."""
+		return self.source[self.starts[index]:self.ends[index]]
+
+	def view(self, index):
+		"""Returns a zero-copy buffer over the source bytes of the token at index."""
+		start = self.starts[index]
+		return buffer(self.source, start, self.ends[index] - start)
+
+	def tokens(self):
+		"""Returns a tuple of Token views, as tokenize() would have."""
+		return tuple(self)
+
+	def position(self, offset):
+		"""Returns the (line, col) of the given source offset."""
+		return self.index.position(offset)
+
+# Maps token classes to their TokenBuffer kind codes.
+_kindCodes = dict((tokenClass, code) for code, tokenClass in enumerate(TokenBuffer.kinds))
+
+# Size of the chunks a document is split into to be tokenized in parallel.
+_parallelChunkSize = 4 << 20
+
+def _splitPoints(source, chunkSize):
+	"""Returns the (start, end) offsets of the chunks source is tokenized in
+parallel in: each chunk but the first starts at the first '<' at least
+chunkSize characters into the chunk before."""
+	starts = [0]
+	while True:
+		match = _ltChar.search(source, starts[-1] + chunkSize)
+		if match is None:
+			break
+		starts.append(match.start())
+	return zip(starts, starts[1:] + [len(source)])
+
+def _scanChunk(piece):
+	"""Tokenizes a (start offset, text) chunk of the document from the scanner's
+start state.  Returns the kind codes, starts and ends of the tokens completed
+in it, the scanner's state and run start at the end of it, and the offset of
+the TokenizeError it hit, if any."""
+	start, chunk = piece
+	kindCodes = array('B')
+	starts = array('l')
+	ends = array('l')
+	stream = ScanTokenStream()
+	stream._base = start
+	try:
+		for tokenClass, tokenStart, tokenEnd in stream._scan(chunk):
+			kindCodes.append(_kindCodes[tokenClass])
+			starts.append(tokenStart)
+			ends.append(tokenEnd)
+	except TokenizeError as e:
+		return (None, None, None, None, None, e.offset)
+	return (kindCodes, starts, ends, stream._state, stream._runStart, None)
+
+# Maps the engine names accepted by tokenize() to their TokenStream classes.
+_engines = {
+	'dfa': TokenStream,
+	'table': TableTokenStream,
+	'scan': ScanTokenStream,
+}
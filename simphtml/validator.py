@@ -0,0 +1,68 @@
+from positions import LineIndex
+from tokens import ScanTokenStream, TokenizeError, _chunks
+from tokens import TextToken, EscapeLtToken, EscapeAmpToken, LtToken, GtToken, SlashToken, IdToken
+
+# Grammar states of the validator.
+_CONTENT = 0
+_LT = 1
+_CLOSE = 2
+_CLOSE_ID = 3
+_OPEN_ID = 4
+_STANDALONE = 5
+
+def validate(lines):
+	"""Returns True if the given document (anything tokenize() accepts) is properly
+formatted simple HTML, False otherwise, giving the same verdict as parse().
+
+Rather than parsing, this runs the grammar of SimpHtmlParser directly over the
+(token class, start, end) records of the scanning engine: no tokens, text or
+AST nodes are created, only the ids of tags, which are kept on a stack while
+the tags are open.  It stops reading at the first error."""
+	chunks = _chunks(lines)
+	if chunks is None:
+		chunks = lines
+	# Positions are never reported, so there is no need to record the lines.
+	stream = ScanTokenStream(None, LineIndex())
+	openIds = []
+	state = _CONTENT
+	try:
+		for chunk, base, records, last in stream._chunkRecords(chunks):
+			for tokenClass, start, end in records:
+				if state == _CONTENT:
+					if tokenClass is LtToken:
+						state = _LT
+					elif not (tokenClass is TextToken or tokenClass is EscapeLtToken or tokenClass is EscapeAmpToken):
+						return False
+				elif state == _LT:
+					if tokenClass is IdToken:
+						id = stream._runText(chunk, base, start, end)
+						state = _OPEN_ID
+					elif tokenClass is SlashToken:
+						state = _CLOSE
+					else:
+						return False
+				elif state == _OPEN_ID:
+					if tokenClass is GtToken:
+						openIds.append(id)
+						state = _CONTENT
+					elif tokenClass is SlashToken:
+						state = _STANDALONE
+					else:
+						return False
+				elif state == _CLOSE:
+					if tokenClass is not IdToken:
+						return False
+					id = stream._runText(chunk, base, start, end)
+					state = _CLOSE_ID
+				elif tokenClass is not GtToken:
+					return False
+				elif state == _STANDALONE:
+					state = _CONTENT
+				elif openIds and openIds[-1] == id:
+					openIds.pop()
+					state = _CONTENT
+				else:
+					return False
+	except TokenizeError:
+		return False
+	return state == _CONTENT and not openIds